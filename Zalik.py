@@ -1,12 +1,216 @@
+import argparse
 import csv
-from typing import List, Dict, Any, Optional
-import matplotlib.pyplot as plt
+import functools
+import hashlib
+import importlib
+import io
+import json
+import logging
+import mmap
+import multiprocessing
+import os
+import struct
+import sys
+import tempfile
+import uuid
+import threading
+import time
+import tracemalloc
+from concurrent.futures import Executor, ProcessPoolExecutor
+from array import array
+from bisect import bisect_left, bisect_right, insort
+from heapq import merge
+from collections import Counter, OrderedDict, deque
+from contextlib import contextmanager
+from itertools import compress, islice
+from operator import itemgetter
+from typing import List, Dict, Any, Optional, Iterable, Iterator, Callable, Tuple, Sequence
 from abc import ABC, abstractmethod
-import streamlit as st
+
+logger = logging.getLogger(__name__)
+
+#Модуль, що імпортується при першому зверненні: ядро працює без streamlit і matplotlib
+class LazyModule:
+    def __init__(self, name: str):
+        self._name: str = name
+        self._module: Any = None
+
+    def __getattr__(self, attr: str) -> Any:
+        if self._module is None:
+            self._module = importlib.import_module(self._name)
+        return getattr(self._module, attr)
+
+st = LazyModule('streamlit')
+
+#Чи виконується код всередині запущеного застосунку Streamlit
+def running_in_streamlit() -> bool:
+    if 'streamlit' not in sys.modules: return False
+    from streamlit import runtime
+    return runtime.exists()
+
+#Повідомлення ядра: у Streamlit - st.info/st.success/st.warning/st.error, інакше - у лог
+def report(level: str, message: str) -> None:
+    if running_in_streamlit():
+        getattr(st, level)(message)
+    else:
+        logger.log(logging.ERROR if level == 'error' else logging.WARNING if level == 'warning' else logging.INFO,
+                   message)
+
+#Як st.cache_resource, але streamlit імпортується лише під час першого виклику
+def cache_resource(func: Callable) -> Callable:
+    cached: Optional[Callable] = None
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        nonlocal cached
+        if cached is None:
+            cached = st.cache_resource(func)
+        return cached(*args, **kwargs)
+    return wrapper
+
+#Права нового файлу, як у open(): 0o666 без бітів umask. umask читається один раз під час імпорту,
+#бо os.umask змінює його для всього процесу, а сторінки Streamlit виконуються в окремих потоках
+def _file_mode_from_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return 0o666 & ~umask
+
+DEFAULT_FILE_MODE = _file_mode_from_umask()
+PRIVATE_FILE_MODE = 0o600  #Тимчасові файли окремої сесії, які не повинні читати інші користувачі
+
+#Атомарний запис: дані пишуться у тимчасовий файл у тій самій папці, який потім замінює path.
+#mkstemp створює файл лише для власника, тому права (file_mode) задаються перед заміною
+@contextmanager
+def atomic_write(path: str, file_mode: int = DEFAULT_FILE_MODE) -> Iterator[io.BufferedIOBase]:
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, temp_path = tempfile.mkstemp(prefix='.tmp-', suffix=os.path.splitext(path)[1], dir=directory)
+    try:
+        with os.fdopen(fd, 'w+b') as file:
+            yield file
+        os.chmod(temp_path, file_mode)
+        os.replace(temp_path, path)
+    except BaseException:
+        os.unlink(temp_path)
+        raise
+
+#Вимірювання етапів (час і виділена пам'ять). Поки запис вимкнено, етап коштує лише перевірку прапорця
+class PerfRecorder:
+    def __init__(self, maxlen: int = 200):
+        self.enabled: bool = False
+        self.trace_memory: bool = False  #Чи запущено tracemalloc цим лічильником
+        self.records: deque = deque(maxlen=maxlen)  #Останні maxlen вимірювань
+        self._lock = threading.Lock()
+        self._active: Counter = Counter()  #Потік -> кількість його незавершених етапів
+        self._overlapped: set = set()  #Потоки, етапи яких перетиналися з етапами інших потоків
+
+#Вмикає/вимикає запис; tracemalloc сповільнює весь процес, тому пам'ять рахується лише на явний запит.
+#Зупиняється лише той tracemalloc, який запустив сам лічильник
+    def set_enabled(self, enabled: bool, trace_memory: bool = False) -> None:
+        trace = enabled and trace_memory
+        if trace and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.trace_memory = True
+        elif not trace and self.trace_memory:
+            if tracemalloc.is_tracing():
+                tracemalloc.stop()
+            self.trace_memory = False
+        self.enabled = enabled
+
+#Вимірює блок коду; для вкладених етапів пікова пам'ять зовнішнього етапу приблизна.
+#tracemalloc один на процес, тому етапи, що перетиналися з етапами інших потоків (пул графіків), пишуться без пам'яті
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        if not self.enabled:
+            yield
+            return
+        thread = threading.get_ident()
+        with self._lock:
+            others = [other for other, depth in self._active.items() if depth and other != thread]
+            if others:
+                self._overlapped.update(others)
+                self._overlapped.add(thread)
+            self._active[thread] += 1
+            tracing = self.trace_memory and tracemalloc.is_tracing() and thread not in self._overlapped
+            if tracing:
+                tracemalloc.reset_peak()
+                memory_before = tracemalloc.get_traced_memory()[0]
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {'stage': name, 'seconds': time.perf_counter() - start, 'timestamp': time.time(),
+                      'thread': threading.current_thread().name}
+            with self._lock:
+                if tracing and thread not in self._overlapped and tracemalloc.is_tracing():
+                    current, peak = tracemalloc.get_traced_memory()
+                    record['alloc_bytes'] = current - memory_before
+                    record['peak_bytes'] = peak - memory_before
+                self._active[thread] -= 1
+                if not self._active[thread]:
+                    del self._active[thread]
+                    self._overlapped.discard(thread)
+                self.records.append(record)
+
+#Вимірює генератор як один етап: рахується лише час усередині next(), без часу споживача.
+#Пам'ять не пишеться, бо виділення генератора й споживача перемішані; запис з'являється, коли ітерацію завершено
+    def timed_iter(self, name: str, iterable: Iterable[Any]) -> Iterator[Any]:
+        iterator = iter(iterable)
+        seconds = 0.0
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    seconds += time.perf_counter() - start
+                yield item
+        finally:
+            with self._lock:
+                self.records.append({'stage': name, 'seconds': seconds, 'timestamp': time.time(),
+                                     'thread': threading.current_thread().name})
+
+    def last(self, count: int) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self.records)[-count:]
+
+#Вимірювання у форматі JSON lines (один запис - один рядок)
+    def export_jsonl(self) -> str:
+        with self._lock:
+            return "".join(json.dumps(record, ensure_ascii=False) + "\n" for record in self.records)
+
+#Один лічильник на процес Streamlit (спільний для всіх сесій і перезапусків сценарію)
+@cache_resource
+def _shared_perf_recorder() -> PerfRecorder:
+    return PerfRecorder()
+
+_perf_recorder: Optional[PerfRecorder] = None
+
+def get_perf_recorder() -> PerfRecorder:
+    global _perf_recorder
+    if _perf_recorder is None:
+        _perf_recorder = _shared_perf_recorder() if running_in_streamlit() else PerfRecorder()
+    return _perf_recorder
+
+#Декоратор: вимірює кожен виклик функції як етап stage
+def timed(stage: str) -> Callable:
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            recorder = get_perf_recorder()
+            if not recorder.enabled:
+                return func(*args, **kwargs)
+            with recorder.stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
 
 # 1. ООП: СУТНОСТІ ШКОЛИ
 #Абстрактний базовий клас(Абстракція)
 class Person(ABC):
+    __slots__ = ('last_name', 'first_name', 'middle_name')
+
     def __init__(self, last_name: str, first_name: str, middle_name: str):
         self.last_name: str = last_name
         self.first_name: str = first_name
@@ -16,8 +220,10 @@ class Person(ABC):
     def get_full_name(self) -> str:
         return f"{self.last_name} {self.first_name} {self.middle_name}"
 
-#Клас, який представляє учня
+#Клас, який представляє учня (легке представлення рядка зі StudentStore, без __dict__)
 class Student(Person):
+    __slots__ = ('birth_year', 'gender', 'average_grade', 'parallel', 'vertical')
+
     def __init__(self, last_name: str, first_name: str, middle_name: str,
                  birth_year: int, gender: str, average_grade: float,
                  parallel: int, vertical: str):
@@ -32,34 +238,164 @@ class Student(Person):
     def display_info(self) -> None:
         st.write(f"Учень: {self.get_full_name()}, {self.parallel}-{self.vertical}, Оцінка: {self.average_grade:.2f}")
 
+#Колонкове сховище учнів: паралельні масиви замість окремого об'єкта на кожного учня
+class StudentStore:
+    COLUMNS: Tuple[str, ...] = ('last_name', 'first_name', 'middle_name', 'birth_year',
+                                'gender', 'average_grade', 'parallel', 'vertical')
+
+    def __init__(self):
+        self.strings: List[str] = []  #Таблиця рядків: ПІБ, стать, вертикалі
+        self._string_ids: Dict[str, int] = {}
+        self.last_name = array('I')
+        self.first_name = array('I')
+        self.middle_name = array('I')
+        self.birth_year = array('H')
+        self.gender = array('I')
+        self.average_grade = array('d')
+        self.parallel = array('B')
+        self.vertical = array('I')
+
+    def __len__(self) -> int:
+        return len(self.average_grade)
+
+#Сховище над готовими колонками (наприклад, memoryview зі знімка); таке сховище лише для читання
+    @classmethod
+    def from_columns(cls, strings: List[str], columns: Dict[str, Sequence]) -> 'StudentStore':
+        store = cls()
+        store.strings = strings
+        store._string_ids = {value: string_id for string_id, value in enumerate(strings)}
+        for name in cls.COLUMNS:
+            setattr(store, name, columns[name])
+        return store
+
+#Копія сховища з власними змінюваними масивами (зокрема для сховища зі знімка)
+    def copy(self) -> 'StudentStore':
+        clone = StudentStore()
+        clone.strings = list(self.strings)
+        clone._string_ids = dict(self._string_ids)
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            copied = array(column_typecode(column))
+            copied.frombytes(memoryview(column).cast('B'))
+            setattr(clone, name, copied)
+        return clone
+
+#Повертає номер рядка в таблиці рядків (однакові рядки зберігаються один раз)
+    def intern(self, value: str) -> int:
+        string_id = self._string_ids.get(value)
+        if string_id is None:
+            string_id = self._string_ids[value] = len(self.strings)
+            self.strings.append(value)
+        return string_id
+
+#Повертає номер рядка таблиці або -1, якщо такого значення немає
+    def lookup(self, value: str) -> int:
+        return self._string_ids.get(value, -1)
+
+#Додає учня в колонки і повертає його номер рядка; сховище зі знімка спершу треба скопіювати (copy)
+    def append(self, last_name: str, first_name: str, middle_name: str, birth_year: int,
+               gender: str, average_grade: float, parallel: int, vertical: str) -> int:
+        if not isinstance(self.last_name, array):
+            raise ValueError("Сховище зі знімка лише для читання: додавати учнів можна в його копію")
+        row = len(self)
+        self.last_name.append(self.intern(last_name))
+        self.first_name.append(self.intern(first_name))
+        self.middle_name.append(self.intern(middle_name))
+        self.birth_year.append(birth_year)
+        self.gender.append(self.intern(gender))
+        self.average_grade.append(average_grade)
+        self.parallel.append(parallel)
+        self.vertical.append(self.intern(vertical))
+        return row
+
+#Вибирає значення колонки для набору рядків одним викликом (без циклу на рівні Python)
+    @staticmethod
+    def take(column, rows) -> List[Any]:
+        if not rows: return []
+        if len(rows) == 1: return [column[rows[0]]]
+        return list(itemgetter(*rows)(column))
+
+#Створює об'єкт Student для рядка лише тоді, коли він потрібен
+#parallel - поточна паралель класу; колонка parallel зберігає паралель на момент завантаження
+    def get_student(self, row: int, parallel: Optional[int] = None) -> Student:
+        strings = self.strings
+        return Student(strings[self.last_name[row]], strings[self.first_name[row]], strings[self.middle_name[row]],
+                       self.birth_year[row], strings[self.gender[row]], self.average_grade[row],
+                       self.parallel[row] if parallel is None else parallel, strings[self.vertical[row]])
+
+#Видаляє рядок, переносячи на його місце останній (без зсуву колонок); повертає колишній номер перенесеного рядка
+    def swap_remove(self, row: int) -> int:
+        last = len(self) - 1
+        for name in self.COLUMNS:
+            column = getattr(self, name)
+            column[row] = column[last]
+            column.pop()
+        return last
+
+#Хеші рядків CSV (у байтах UTF-8), відтворених з колонок у порядку header (для всіх рядків або лише для rows).
+#Значення, які у CSV взяли б у лапки, позначаються '\n', тож такий рядок не збігається з жодним рядком файлу
+    def line_hashes(self, header: Sequence[str], rows: Optional[Sequence[int]] = None) -> array:
+        text = [value if value == value.strip() and not any(c in value for c in ',"\r\n') else '\n' + value
+                for value in self.strings]
+        columns: List[Iterable[str]] = []
+        for name in header:
+            column = getattr(self, name) if rows is None else self.take(getattr(self, name), rows)
+            if name in ('birth_year', 'parallel'):
+                columns.append(map(str, column))
+            elif name == 'average_grade':
+                columns.append(map(repr, column))
+            else:
+                columns.append(map(text.__getitem__, column))
+        return array('q', map(hash, map(str.encode, map(','.join, zip(*columns)))))
+
 #Клас, який представляє один клас школи
 class SchoolClass:
-    def __init__(self, parallel: int, vertical: str):
+    def __init__(self, parallel: int, vertical: str, store: Optional[StudentStore] = None):
         self.parallel: int = parallel
         self.vertical: str = vertical
-        self.students: List[Student] = []  #Інкапсуляція списку учнів
+        self.store: StudentStore = store if store is not None else StudentStore()
+        self.rows = array('I')  #Інкапсуляція: номери рядків учнів у сховищі
+
+#Учні класу лише для читання (об'єкти створюються на вимогу, їх зміни не потрапляють у сховище);
+#додавати учнів - через add_student
+    @property
+    def students(self) -> Tuple[Student, ...]:
+        return tuple(self.store.get_student(row, self.parallel) for row in self.rows)
+
+#Додає учня до класу
+    def add_student(self, student: Student) -> None:
+        self.rows.append(self.store.append(
+            student.last_name, student.first_name, student.middle_name, student.birth_year,
+            student.gender, student.average_grade, self.parallel, self.vertical))
 
 #Повертає повну назву класу, наприклад 8-А
     def get_class_name(self) -> str:
         return f"{self.parallel}-{self.vertical}"
 
     def get_student_count(self) -> int:
-        return len(self.students)
+        return len(self.rows)
 
-#Метод переведення класу на наступний рік
+#Метод переведення класу на наступний рік: змінюється лише паралель класу, учні її успадковують
     def promote_class(self) -> None:
         if self.parallel < 11:
             self.parallel += 1
-            for student in self.students:
-                student.parallel = self.parallel
         elif self.parallel == 11:
             self.parallel = 12  # 11-й клас "випускається"
 
+#Копія класу через years років; учні (rows) спільні з оригіналом і не копіюються
+    def projected(self, years: int) -> 'SchoolClass':
+        projection = SchoolClass(self.parallel, self.vertical, self.store)
+        projection.rows = self.rows
+        for _ in range(years):
+            projection.promote_class()
+        return projection
+
 #Базовий клас для працівників, тут і спадкування і поліморфізм
 class Employee(Person, ABC):
     BASE_SALARIES: Dict[str, float] = {
         'Director': 15000.0, 'Teacher': 12000.0, 'SecurityGuard': 11000.0
     }
+    BATCH_COLUMNS: Tuple[str, ...] = ()  #Колонки стажу, потрібні для пакетного розрахунку
 
     def __init__(self, last_name: str, first_name: str, middle_name: str, position: str):
         super().__init__(last_name, first_name, middle_name)
@@ -72,8 +408,16 @@ class Employee(Person, ABC):
     def calculate_salary(self) -> float:
         pass
 
+#Та сама формула для цілої групи працівників посади (колонки в порядку BATCH_COLUMNS)
+    @classmethod
+    @abstractmethod
+    def calculate_salaries(cls, *columns: Sequence[int]) -> List[float]:
+        pass
+
 #Клас вчитель
 class Teacher(Employee):
+    BATCH_COLUMNS = ('pedagogical_experience',)
+
     def __init__(self, last_name: str, first_name: str, middle_name: str, pedagogical_experience: int):
         super().__init__(last_name, first_name, middle_name, 'Teacher')
         self.pedagogical_experience: int = pedagogical_experience
@@ -83,8 +427,15 @@ class Teacher(Employee):
         exp = self.pedagogical_experience if self.pedagogical_experience > 0 else 1
         return self.base_salary * exp / 30
 
+    @classmethod
+    def calculate_salaries(cls, pedagogical_experience: Sequence[int]) -> List[float]:
+        base_salary = cls.BASE_SALARIES.get('Teacher', 10000.0)
+        return [base_salary * (exp if exp > 0 else 1) / 30 for exp in pedagogical_experience]
+
 #Клас Директор(Спадкування від вчителя)
 class Director(Teacher):
+    BATCH_COLUMNS = ('pedagogical_experience', 'management_experience')
+
     def __init__(self, last_name: str, first_name: str, middle_name: str,
                  pedagogical_experience: int, management_experience: int):
         super().__init__(last_name, first_name, middle_name, pedagogical_experience)
@@ -97,8 +448,17 @@ class Director(Teacher):
         exp_ped = self.pedagogical_experience if self.pedagogical_experience > 0 else 1
         return (self.base_salary * exp_ped / 50) + (self.management_experience * 500)
 
+    @classmethod
+    def calculate_salaries(cls, pedagogical_experience: Sequence[int],
+                           management_experience: Sequence[int]) -> List[float]:
+        base_salary = cls.BASE_SALARIES.get('Director', 15000.0)
+        return [(base_salary * (exp_ped if exp_ped > 0 else 1) / 50) + (exp_mgmt * 500)
+                for exp_ped, exp_mgmt in zip(pedagogical_experience, management_experience)]
+
 #Клас охоронець
 class SecurityGuard(Employee):
+    BATCH_COLUMNS = ('total_experience',)
+
     def __init__(self, last_name: str, first_name: str, middle_name: str, total_experience: int):
         super().__init__(last_name, first_name, middle_name, 'SecurityGuard')
         self.total_experience: int = total_experience
@@ -107,44 +467,574 @@ class SecurityGuard(Employee):
     def calculate_salary(self) -> float:
         return self.base_salary + (self.total_experience * 250)
 
+    @classmethod
+    def calculate_salaries(cls, total_experience: Sequence[int]) -> List[float]:
+        base_salary = cls.BASE_SALARIES.get('SecurityGuard', 10000.0)
+        return [base_salary + (exp * 250) for exp in total_experience]
+
+#Посада -> клас працівника, чия формула застосовується в пакетному розрахунку
+EMPLOYEE_CLASSES: Dict[str, type] = {'Director': Director, 'Teacher': Teacher, 'SecurityGuard': SecurityGuard}
+
+#Пакетний розрахунок зарплат для великого штату: колонки замість об'єктів, групування за посадою
+class PayrollBatch:
+    def __init__(self):
+        self.names: List[str] = []
+        self.positions: List[str] = []
+        self.pedagogical_experience = array('i')
+        self.management_experience = array('i')
+        self.total_experience = array('i')
+        self.salaries = array('d')
+
+    def __len__(self) -> int:
+        return len(self.names)
+
+#Заповнення колонок з рядків STAFF_SCHEMA (наприклад, з iter_csv_rows)
+    @classmethod
+    def from_rows(cls, rows: Iterable[Dict[str, Any]]) -> 'PayrollBatch':
+        batch = cls()
+        for row in rows:
+            if row['position'] not in EMPLOYEE_CLASSES:
+                raise ValueError(f"невідома посада: {row['position']}")
+            batch.names.append(f"{row['last_name']} {row['first_name']} {row['middle_name']}")
+            batch.positions.append(row['position'])
+            batch.pedagogical_experience.append(row['pedagogical_experience'])
+            batch.management_experience.append(row['management_experience'])
+            batch.total_experience.append(row['total_experience'])
+        return batch
+
+#Рахує зарплати: кожна група посади отримує формулу свого класу одним викликом
+    @timed('payroll')
+    def calculate(self) -> array:
+        groups: Dict[str, array] = {}
+        for index, position in enumerate(self.positions):
+            groups.setdefault(position, array('I')).append(index)
+
+        salaries = array('d', bytes(8 * len(self)))
+        for position, indexes in groups.items():
+            employee_class = EMPLOYEE_CLASSES[position]
+            columns = [StudentStore.take(getattr(self, name), indexes) for name in employee_class.BATCH_COLUMNS]
+            for index, salary in zip(indexes, employee_class.calculate_salaries(*columns)):
+                salaries[index] = salary
+        self.salaries = salaries
+        return salaries
+
+#Рядки таблиці зарплат у тому ж вигляді, що й на сторінці зарплат (генератор, без повного списку)
+    def iter_rows(self) -> Iterator[Dict[str, Any]]:
+        for index, (name, position) in enumerate(zip(self.names, self.positions)):
+            employee_class = EMPLOYEE_CLASSES[position]
+            row = {'ПІБ': name, 'Посада': position, 'Базова Ставка': Employee.BASE_SALARIES.get(position, 10000.0),
+                   'Розрахована Зарплата (грн)': f"{self.salaries[index]:.2f}"}
+            if issubclass(employee_class, Teacher): row['Педагогічний Стаж'] = self.pedagogical_experience[index]
+            if issubclass(employee_class, Director): row['Стаж Керування'] = self.management_experience[index]
+            if issubclass(employee_class, SecurityGuard): row['Загальний Досвід'] = self.total_experience[index]
+            yield row
+
 
 
 #2. ШКОЛА
 
+#Перцентилі середньої оцінки, які рахуються для класів і паралелей
+GRADE_PERCENTILES = (25, 50, 75, 90)
+
+#Перцентиль відсортованого списку з лінійною інтерполяцією
+def percentile(sorted_values: List[float], q: float) -> float:
+    position = (len(sorted_values) - 1) * q / 100
+    lower = int(position)
+    upper = min(lower + 1, len(sorted_values) - 1)
+    return sorted_values[lower] + (sorted_values[upper] - sorted_values[lower]) * (position - lower)
+
+#Середнє, медіана та перцентилі для відсортованого списку оцінок
+def summarize_grades(grades: List[float]) -> Dict[str, float]:
+    summary: Dict[str, float] = {'count': len(grades), 'mean': sum(grades) / len(grades)}
+    for q in GRADE_PERCENTILES:
+        summary[f'p{q}'] = percentile(grades, q)
+    summary['median'] = summary['p50']
+    return summary
+
+#Результат групування учнів: усі ключові агрегати (по паралелі, вертикалі, року, статі, класу) за один прохід
+class SchoolAggregates:
+    def __init__(self):
+        self.total_students: int = 0
+        self.class_sizes: List[Tuple[str, int]] = []  #(назва класу, к-ть учнів) у порядку School.classes
+        self.by_parallel: Dict[int, int] = {}
+        self.by_vertical: Dict[str, int] = {}
+        self.classes_by_vertical: Dict[str, int] = {}
+        self.by_birth_year: Dict[int, int] = {}
+        self.by_gender: Dict[str, int] = {}
+        self.grades_by_class: Dict[str, List[float]] = {}  #Відсортовані оцінки
+        self.grades_by_parallel: Dict[int, List[float]] = {}  #Відсортовані оцінки
+        self._summaries: Dict[tuple, Dict[str, float]] = {}  #(вид, ключ) -> summarize_grades, рахується на вимогу
+        self._owned: set = set()  #Списки оцінок, уже скопійовані для зміни (решта спільні з оригіналом)
+
+#Підсумок оцінок класу (kind='class') або паралелі (kind='parallel'); незмінені списки не перераховуються
+    def grade_summary(self, kind: str, key: Any) -> Dict[str, float]:
+        summary = self._summaries.get((kind, key))
+        if summary is None:
+            grades = self.grades_by_class[key] if kind == 'class' else self.grades_by_parallel[key]
+            summary = self._summaries[(kind, key)] = summarize_grades(grades)
+        return summary
+
+#Копія, яку можна змінювати, не зачіпаючи закешований оригінал; списки оцінок копіюються лише при першій зміні
+    def copy(self) -> 'SchoolAggregates':
+        clone = SchoolAggregates()
+        clone.total_students = self.total_students
+        clone.class_sizes = list(self.class_sizes)
+        for name in ('by_parallel', 'by_vertical', 'classes_by_vertical', 'by_birth_year', 'by_gender',
+                     'grades_by_class', 'grades_by_parallel', '_summaries'):
+            setattr(clone, name, dict(getattr(self, name)))
+        return clone
+
+#Додає (delta=1) або прибирає (delta=-1) одного учня поточного класу без повторного групування
+    def apply_student(self, class_name: str, parallel: int, vertical: str, birth_year: int,
+                      gender: str, grade: float, delta: int) -> None:
+        position = next(i for i, (name, _) in enumerate(self.class_sizes) if name == class_name)
+        self.class_sizes[position] = (class_name, self.class_sizes[position][1] + delta)
+        self.total_students += delta
+        self.by_vertical[vertical] += delta
+        for counts, key in ((self.by_parallel, parallel), (self.by_birth_year, birth_year), (self.by_gender, gender)):
+            counts[key] = counts.get(key, 0) + delta
+            if not counts[key]: del counts[key]
+        for kind, grades_by, key in (('class', self.grades_by_class, class_name),
+                                     ('parallel', self.grades_by_parallel, parallel)):
+            if (kind, key) not in self._owned:
+                grades_by[key] = list(grades_by.get(key, ()))
+                self._owned.add((kind, key))
+            self._summaries.pop((kind, key), None)
+            grades = grades_by[key]  # Спорожнілий список лишається до settle: клас може знову заповнитися в тій самій зміні
+            if delta > 0:
+                insort(grades, grade)
+            else:
+                del grades[bisect_left(grades, grade)]
+
+#Після всіх apply_student: прибирає спорожнілі групи й повертає ключам порядок класів, як в aggregate_classes
+    def settle(self, classes: Iterable[SchoolClass]) -> None:
+        classes = list(classes)
+        parallels = list(dict.fromkeys(cls.parallel for cls in classes))
+        self.grades_by_class = {name: self.grades_by_class[name] for name in (cls.get_class_name() for cls in classes)
+                                if self.grades_by_class.get(name)}
+        self.grades_by_parallel = {p: self.grades_by_parallel[p] for p in parallels if self.grades_by_parallel.get(p)}
+        self.by_parallel = {p: self.by_parallel[p] for p in parallels if p in self.by_parallel}
+
+#Групує учнів переданих класів, читаючи кожен рядок сховища один раз
+def aggregate_classes(classes: Iterable[SchoolClass], store: StudentStore) -> SchoolAggregates:
+    result = SchoolAggregates()
+    birth_years: Counter = Counter()
+    genders: Counter = Counter()
+
+    for cls in classes:
+        rows, class_name = cls.rows, cls.get_class_name()
+        count = len(rows)
+        result.total_students += count
+        result.class_sizes.append((class_name, count))
+        result.by_vertical[cls.vertical] = result.by_vertical.get(cls.vertical, 0) + count
+        result.classes_by_vertical[cls.vertical] = result.classes_by_vertical.get(cls.vertical, 0) + 1
+        if not count: continue
+
+        result.by_parallel[cls.parallel] = result.by_parallel.get(cls.parallel, 0) + count
+        birth_years.update(store.take(store.birth_year, rows))
+        genders.update(store.take(store.gender, rows))
+        grades = store.take(store.average_grade, rows)
+        result.grades_by_class[class_name] = grades
+        result.grades_by_parallel.setdefault(cls.parallel, []).extend(grades)
+
+    for grades in result.grades_by_class.values(): grades.sort()
+    for grades in result.grades_by_parallel.values(): grades.sort()
+    result.by_birth_year = dict(birth_years)
+    result.by_gender = {store.strings[gender_id]: count for gender_id, count in genders.items()}
+    return result
+
+#Починаючи з цієї кількості учнів графік "оцінка vs паралель" малюється як 2D-гістограма, а не точки
+SCATTER_DENSITY_THRESHOLD = 20000
+SCATTER_GRADE_BINS = 24
+
+#Кількість оцінок паралелі в кожному інтервалі (оцінки відсортовані, тому лише бінарний пошук по межах)
+def bin_sorted_grades(grades: List[float], edges: List[float]) -> List[int]:
+    positions = [bisect_left(grades, edge) for edge in edges[:-1]] + [bisect_right(grades, edges[-1])]
+    return [positions[i + 1] - positions[i] for i in range(len(edges) - 1)]
+
+#Готує дані для графіка "оцінка vs паралель" у вигляді сітки паралель x інтервал оцінки
+def build_grade_density(grades_by_parallel: Dict[int, List[float]], bins: int = SCATTER_GRADE_BINS) -> tuple:
+    low = min(grades[0] for grades in grades_by_parallel.values())
+    high = max(grades[-1] for grades in grades_by_parallel.values())
+    if high == low: high = low + 1
+    edges = [low + (high - low) * i / bins for i in range(bins + 1)]
+    parallels = list(range(min(grades_by_parallel), max(grades_by_parallel) + 1))
+    empty = [0] * bins
+    counts = [bin_sorted_grades(grades_by_parallel[p], edges) if p in grades_by_parallel else empty
+              for p in parallels]
+    return parallels, edges, counts
+
+#Готує дані для чотирьох графіків із результату групування
+def build_chart_data(aggregates: SchoolAggregates,
+                     density_threshold: int = SCATTER_DENSITY_THRESHOLD) -> Dict[str, tuple]:
+    #Учні по паралелях
+    parallels = sorted(aggregates.by_parallel.keys())
+    #Середня кількість по вертикалях: учні вертикалі / класи вертикалі
+    verticals = sorted(aggregates.by_vertical.keys())
+    #Рік народження → кількість учнів
+    years = sorted(aggregates.by_birth_year.keys())
+    chart_data: Dict[str, tuple] = {
+        'parallels': (parallels, [aggregates.by_parallel[p] for p in parallels]),
+        'verticals': (verticals, [aggregates.by_vertical[v] / aggregates.classes_by_vertical[v] for v in verticals]),
+        'birth_years': (years, [aggregates.by_birth_year[y] for y in years]),
+    }
+    #Scatter: Оцінка vs Паралель (для великої кількості учнів - щільність за інтервалами)
+    if aggregates.total_students >= density_threshold:
+        chart_data['scatter_density'] = build_grade_density(aggregates.grades_by_parallel)
+    else:
+        scatter_x = [p for p, grades in aggregates.grades_by_parallel.items() for _ in grades]
+        scatter_y = [g for grades in aggregates.grades_by_parallel.values() for g in grades]
+        chart_data['scatter'] = (scatter_x, scatter_y)
+    return chart_data
+
+#Малювання графіків на осях (без глобального стану pyplot)
+def draw_parallels_chart(ax, data: Tuple[list, list]) -> None:
+    parallels, counts = data
+    ax.bar(parallels, counts, color='purple')
+    ax.set_xlabel("Паралель")
+    ax.set_ylabel("Кількість учнів")
+    ax.set_xticks(parallels)
+
+def draw_verticals_chart(ax, data: Tuple[list, list]) -> None:
+    verticals, avg_counts = data
+    ax.bar(verticals, avg_counts, color='red')
+    ax.set_xlabel("Вертикаль")
+    ax.set_ylabel("Сер. кількість учнів")
+
+def draw_birth_years_chart(ax, data: Tuple[list, list]) -> None:
+    years, counts_by_year = data
+    ax.plot(years, counts_by_year, marker='o', linestyle='-', color='black')
+    ax.set_xlabel("Рік народження")
+    ax.set_ylabel("Кількість учнів")
+    ax.set_xticks(years)
+
+def draw_scatter_chart(ax, data: Tuple[list, list]) -> None:
+    scatter_x, scatter_y = data
+    ax.scatter(scatter_x, scatter_y, alpha=0.5, color='orange')
+    ax.set_xlabel("Паралель")
+    ax.set_ylabel("Середня оцінка")
+    ax.set_xticks(sorted(set(scatter_x)))
+
+#Щільність: колір клітинки - кількість учнів паралелі з оцінкою в інтервалі
+def draw_scatter_density_chart(ax, data: tuple) -> None:
+    parallels, edges, counts = data
+    x_edges = [p - 0.5 for p in parallels] + [parallels[-1] + 0.5]
+    grid = [list(row) for row in zip(*counts)]  # Рядки - інтервали оцінок, стовпці - паралелі
+    mesh = ax.pcolormesh(x_edges, edges, grid, cmap='Oranges')
+    ax.figure.colorbar(mesh, ax=ax, label="Кількість учнів")
+    ax.set_xlabel("Паралель")
+    ax.set_ylabel("Середня оцінка")
+    ax.set_xticks(parallels)
+
+#Графіки панелі: ключ даних -> (заголовок, функція малювання)
+CHARTS: Dict[str, Tuple[str, Callable[[Any, tuple], None]]] = {
+    'parallels': ("Розподіл учнів по паралелях", draw_parallels_chart),
+    'verticals': ("Середня к-ть учнів по вертикалях", draw_verticals_chart),
+    'birth_years': ("Учні за роком народження", draw_birth_years_chart),
+    'scatter': ("Середня оцінка учнів vs Паралель", draw_scatter_chart),
+    'scatter_density': ("Середня оцінка учнів vs Паралель", draw_scatter_density_chart),
+}
+
+#Малює один графік на бекенді Agg без реєстру фігур pyplot і повертає зображення (PNG/SVG байти).
+#Функція модуля, а не метод, щоб її можна було передати в пул процесів
+def draw_chart(kind: str, data: tuple, image_format: str, dpi: int) -> bytes:
+    from matplotlib.figure import Figure  # Лінивий імпорт: matplotlib потрібен лише для малювання
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure()
+    FigureCanvasAgg(fig)
+    try:
+        CHARTS[kind][1](fig.add_subplot(), data)
+        buffer = io.BytesIO()
+        fig.savefig(buffer, format=image_format, dpi=dpi, bbox_inches='tight')
+        return buffer.getvalue()
+    finally:
+        fig.clear()  # Звільняємо фігуру одразу, не чекаючи збирача сміття
+
+#Малює графіки панелі; готові зображення кешуються за даними графіка
+class ChartRenderer:
+    def __init__(self, cache: Optional['LRUCache'] = None, image_format: str = 'png', dpi: int = 200,
+                 executor: Optional[Executor] = None, draw: Callable[[str, tuple, str, int], bytes] = draw_chart):
+        self.cache: LRUCache = cache if cache is not None else LRUCache(maxsize=32)
+        self.image_format: str = image_format  # 'png' або 'svg'
+        self.dpi: int = dpi  # Як у st.pyplot за замовчуванням
+        self.executor: Optional[Executor] = executor  #Пул для паралельного малювання (None - послідовно)
+        self.draw: Callable[[str, tuple, str, int], bytes] = draw  #Для пулу процесів - функція, яку можна передати pickle
+
+#Ключ кешу: відбиток даних графіка
+    @staticmethod
+    def data_key(data: tuple) -> str:
+        return hashlib.sha1(repr(data).encode('utf-8')).hexdigest()
+
+    def _key(self, kind: str, data: tuple) -> tuple:
+        return kind, self.image_format, self.dpi, self.data_key(data)
+
+#Повертає зображення графіка (PNG/SVG байти); незмінені графіки беруться з кешу
+    def render(self, kind: str, data: tuple) -> bytes:
+        with get_perf_recorder().stage(f"chart:{kind}"):
+            return self.cache.get_or_create(self._key(kind, data),
+                                            lambda: self.draw(kind, data, self.image_format, self.dpi))
+
+#Малює кілька графіків; з пулом - одночасно, у пул передаються лише графіки, яких немає в кеші.
+#Порядок результатів як у charts
+    def render_all(self, charts: Dict[str, tuple]) -> Dict[str, bytes]:
+        if self.executor is None:
+            return {kind: self.render(kind, data) for kind, data in charts.items()}
+        with get_perf_recorder().stage('render_all'):
+            images: Dict[str, bytes] = {}
+            pending = []
+            for kind, data in charts.items():
+                key = self._key(kind, data)
+                image = self.cache.get(key)
+                if image is None:
+                    pending.append((kind, key, self.executor.submit(self.draw, kind, data, self.image_format, self.dpi)))
+                else:
+                    images[kind] = image
+            for kind, key, future in pending:
+                images[kind] = future.result()
+                self.cache.put(key, images[kind])
+            return {kind: images[kind] for kind in charts}
+
+NO_SLOT = 0xFFFFFFFF  #Рядок сховища не належить жодному класу
+
+#Вторинні індекси над учнями школи: хеш-індекс за ПІБ і відсортовані індекси за оцінкою та роком народження.
+#Індекс посилається на масиви rows класів (а не на паралелі), тому лишається правильним після переведення
+#і спільний для прогнозів школи, які ділять ті самі масиви rows
+class StudentIndex:
+    def __init__(self, classes: Iterable[SchoolClass], store: StudentStore):
+        self.store: StudentStore = store
+        self.slots: List[Sequence[int]] = []  #Масиви rows класів
+        self.row_slot = array('I', [NO_SLOT]) * len(store)  #Рядок сховища -> номер масиву rows
+        self.by_name: Dict[str, List[int]] = {}
+        self.slot_rows_by_grade: List[List[int]] = []  #Рядки кожного класу за спаданням оцінки
+
+        strings, grades = store.strings, store.average_grade
+        rows: List[int] = []
+        for slot, cls in enumerate(classes):
+            rows.extend(cls.rows)
+            self.slots.append(cls.rows)
+            for row in cls.rows:
+                self.row_slot[row] = slot
+                full_name = f"{strings[store.last_name[row]]} {strings[store.first_name[row]]} {strings[store.middle_name[row]]}"
+                self.by_name.setdefault(full_name, []).append(row)
+            self.slot_rows_by_grade.append(sorted(cls.rows, key=lambda row: -grades[row]))
+
+        self.grade_order = array('I', sorted(rows, key=grades.__getitem__))
+        self.grade_keys = array('d', (grades[row] for row in self.grade_order))
+        self.birth_order = array('I', sorted(rows, key=store.birth_year.__getitem__))
+        self.birth_keys = array('H', (store.birth_year[row] for row in self.birth_order))
+
+#Рядки з відсортованого індексу, ключ яких лежить у межах [low, high]
+    @staticmethod
+    def range_rows(order: Sequence[int], keys: Sequence, low: Any, high: Any) -> Sequence[int]:
+        start = 0 if low is None else bisect_left(keys, low)
+        end = len(keys) if high is None else bisect_right(keys, high)
+        return order[start:end]
+
 #Головний клас, що керує сутностями школи та її статистикою
 class School:
     def __init__(self, name: str = "Школа №2"):
         self.name: str = name
         self.classes: Dict[str, SchoolClass] = {}
+        self.store: StudentStore = StudentStore()  #Колонкове сховище всіх учнів школи
+        self.fingerprint: Optional[str] = None  #Відбиток вмісту CSV, з яких завантажено школу
+        self.version: int = 0  #Кількість переведень після завантаження
+        self.derived_cache: Optional['LRUCache'] = None  #Спільний кеш статистики та даних графіків
+        self._derived: Dict[str, Any] = {}  #Похідні результати поточної версії школи
+        self._snapshot_buffer: Any = None  #Буфер знімка, над яким побудовані колонки
+        self._index: Optional[StudentIndex] = None  #Вторинні індекси (будуються при першому запиті)
+        self._line_hashes: Optional[Tuple[tuple, array]] = None  #(заголовок students.csv, хеш рядка CSV кожного рядка сховища)
 
 #Завантаження даних в об'єкти
-    def load_data_from_csv(self, classes_data: List[Dict[str, Any]], students_data: List[Dict[str, Any]]) -> bool:
+    @timed('load_data_from_csv')
+    def load_data_from_csv(self, classes_data: Iterable[Dict[str, Any]], students_data: Iterable[Dict[str, Any]],
+                           fingerprint: Optional[str] = None) -> bool:
         self.classes = {}
+        self.store = StudentStore()
+        self.fingerprint, self.version, self._derived = fingerprint, 0, {}
+        self._index = self._line_hashes = None
         try:
             for row in classes_data:
                 self.classes[f"{int(row['parallel'])}-{row['vertical']}"] = SchoolClass(int(row['parallel']),
-                                                                                        str(row['vertical']))
+                                                                                        str(row['vertical']), self.store)
         except Exception:
-            st.error("Помилка: Неправильний формат у classes.csv.")
+            report('error', "Помилка: Неправильний формат у classes.csv.")
             return False
 
         try:
+            store = self.store
             for row in students_data:
                 class_name = f"{int(row['parallel'])}-{str(row['vertical'])}"
-                if class_name in self.classes:
-                    student = Student(
-                        last_name=row['last_name'], first_name=row['first_name'], middle_name=row['middle_name'],
-                        birth_year=int(row['birth_year']), gender=row['gender'],
-                        average_grade=float(row['average_grade']),
-                        parallel=int(row['parallel']), vertical=str(row['vertical'])
-                    )
-                    self.classes[class_name].students.append(student)  # Додавання учня
-            st.success(f"Успішно завантажено {len(self.classes)} класів та {self.get_total_student_count()} учнів.")
+                school_class = self.classes.get(class_name)
+                if school_class is not None:
+                    school_class.rows.append(store.append(  # Додавання учня одразу в колонки
+                        row['last_name'], row['first_name'], row['middle_name'], int(row['birth_year']),
+                        row['gender'], float(row['average_grade']), int(row['parallel']), str(row['vertical'])))
+            report('success', f"Успішно завантажено {len(self.classes)} класів та {self.get_total_student_count()} учнів.")
             return True
         except Exception:
-            st.error("Помилка: Неправильний формат або відсутні колонки у students.csv.")
+            report('error', "Помилка: Неправильний формат або відсутні колонки у students.csv.")
             return False
 
+#Змінювана копія школи: власне сховище та масиви класів, закешовані результати переходять без перерахунку
+    def copy(self) -> 'School':
+        clone = School(self.name)
+        clone.store = self.store.copy()
+        clone.fingerprint, clone.version, clone.derived_cache = self.fingerprint, self.version, self.derived_cache
+        clone._derived = dict(self._derived)
+        if self._line_hashes is not None:
+            clone._line_hashes = (self._line_hashes[0], array('q', self._line_hashes[1]))
+        for class_name, cls in self.classes.items():
+            copied = SchoolClass(cls.parallel, cls.vertical, clone.store)
+            copied.rows = array('I', cls.rows)
+            clone.classes[class_name] = copied
+        return clone
+
+#Клас, у якому лежить рядок (до переведень клас учня збігається з паралеллю та вертикаллю з CSV)
+    def _class_of_row(self, row: int) -> SchoolClass:
+        store = self.store
+        return self.classes[f"{store.parallel[row]}-{store.strings[store.vertical[row]]}"]
+
+#Елементи items, хеш яких входить у selected; для хешів з quota лише quota[хеш] останніх таких елементів
+    @staticmethod
+    def _select_by_hash(items: Sequence[Any], hashes: Sequence[int], selected: set, quota: Dict[int, int]) -> List[Any]:
+        result = []
+        quota = dict(quota)
+        for line_hash, item in reversed(list(compress(zip(hashes, items), map(selected.__contains__, hashes)))):
+            if line_hash in quota:
+                if not quota[line_hash]: continue
+                quota[line_hash] -= 1
+            result.append(item)
+        result.reverse()
+        return result
+
+#Інкрементне перезавантаження students.csv (файл у двійковому режимі). Хеші рядків файлу порівнюються як множини
+#з хешами рядків, відтворених з колонок, тож незмінені рядки не розбираються взагалі; розбираються лише нові рядки,
+#а вони зіставляються з учнями, чиїх рядків у файлі немає, за ключем (ПІБ і рік народження).
+#Застосовуються лише вставки, зміни та видалення, агрегати оновлюються на різницю,
+#а видалені рядки прибираються зі сховища
+    @timed('update_students')
+    def update_students_from_csv(self, students_file, fingerprint: Optional[str] = None) -> Optional[Dict[str, int]]:
+        store = self.store
+        if self.version != 0 or not isinstance(store.last_name, array):
+            raise ValueError("Інкрементне оновлення можливе лише для змінюваної копії школи до переведень")
+
+        try:
+            students_file.seek(0)
+            lines = students_file.read().splitlines()
+            header = tuple(key.strip() for key in next(csv.reader([lines[0].decode('utf-8')]), [])) if lines else ()
+            lines = lines[1:]
+            if self._line_hashes is not None and self._line_hashes[0] == header:
+                hashes: Optional[array] = self._line_hashes[1]
+            elif set(header) == set(STUDENTS_SCHEMA):
+                hashes = store.line_hashes(header)
+            else:
+                hashes = None  # Зайві колонки: рядки не відтворити, розбираємо весь файл
+
+            if hashes is None:
+                pending, stale = lines, list(range(len(store)))
+            else:
+                # Рядки, яких немає серед старих, і старі рядки, яких немає у файлі (для повторів - різниця кількостей)
+                new_hashes = array('q', map(hash, lines))
+                old_set, new_set = set(hashes), set(new_hashes)
+                added, removed = new_set - old_set, old_set - new_set
+                extra_lines: Dict[int, int] = {}
+                extra_rows: Dict[int, int] = {}
+                if len(old_set) < len(hashes) or len(new_set) < len(new_hashes):
+                    old_counts, new_counts = Counter(hashes), Counter(new_hashes)
+                    for line_hash in {h for h, count in old_counts.items() if count > 1 and h in new_set} | \
+                                     {h for h, count in new_counts.items() if count > 1 and h in old_set}:
+                        difference = new_counts[line_hash] - old_counts[line_hash]
+                        if difference > 0: extra_lines[line_hash] = difference
+                        elif difference < 0: extra_rows[line_hash] = -difference
+                pending = self._select_by_hash(lines, new_hashes, added | extra_lines.keys(), extra_lines)
+                stale = self._select_by_hash(range(len(hashes)), hashes, removed | extra_rows.keys(), extra_rows)
+
+            changed = []
+            for data in parse_csv_records(csv.reader(line.decode('utf-8') for line in pending), header, STUDENTS_SCHEMA):
+                school_class = self.classes.get(f"{int(data['parallel'])}-{str(data['vertical'])}")
+                if school_class is not None:
+                    changed.append((data, school_class))
+        except Exception:
+            report('error', "Помилка: Неправильний формат або відсутні колонки у students.csv.")
+            return None
+
+        # Учні, чиї рядки не знайшлися у файлі без змін, за ключем
+        unmatched: Dict[tuple, List[int]] = {}
+        for row in stale:
+            key = (store.last_name[row], store.first_name[row], store.middle_name[row], store.birth_year[row])
+            unmatched.setdefault(key, []).append(row)
+
+        aggregates = self.get_aggregates().copy()
+        counts = {'inserted': 0, 'updated': 0, 'deleted': 0, 'unchanged': len(store) - len(stale)}
+
+        def apply(row: int, delta: int) -> SchoolClass:
+            cls = self._class_of_row(row)
+            if 1 <= cls.parallel <= 11:
+                aggregates.apply_student(cls.get_class_name(), cls.parallel, cls.vertical, store.birth_year[row],
+                                         store.strings[store.gender[row]], store.average_grade[row], delta)
+            return cls
+
+        touched = []
+        for data, school_class in changed:
+            key = (store.lookup(data['last_name']), store.lookup(data['first_name']),
+                   store.lookup(data['middle_name']), int(data['birth_year']))
+            values = (store.lookup(data['gender']), float(data['average_grade']), school_class.parallel,
+                      store.lookup(school_class.vertical))
+            candidates = unmatched.get(key)
+            if candidates:
+                row = next((r for r in candidates if (store.gender[r], store.average_grade[r], store.parallel[r],
+                                                      store.vertical[r]) == values), candidates[0])
+                candidates.remove(row)
+                if (store.gender[row], store.average_grade[row], store.parallel[row], store.vertical[row]) == values:
+                    counts['unchanged'] += 1  # Той самий запис, записаний інакше (наприклад, 9.50 замість 9.5)
+                else:
+                    old_class = apply(row, -1)
+                    store.gender[row] = store.intern(data['gender'])
+                    store.average_grade[row] = float(data['average_grade'])
+                    store.parallel[row] = school_class.parallel
+                    store.vertical[row] = store.intern(school_class.vertical)
+                    apply(row, 1)
+                    if old_class is not school_class:
+                        old_class.rows.remove(row)
+                        school_class.rows.append(row)
+                    counts['updated'] += 1
+            else:
+                row = store.append(data['last_name'], data['first_name'], data['middle_name'], int(data['birth_year']),
+                                   data['gender'], float(data['average_grade']), school_class.parallel,
+                                   school_class.vertical)
+                apply(row, 1)
+                school_class.rows.append(row)
+                counts['inserted'] += 1
+            touched.append(row)
+
+        if hashes is not None:
+            hashes.frombytes(bytes(8 * (len(store) - len(hashes))))
+            for row, line_hash in zip(touched, store.line_hashes(header, touched)):
+                hashes[row] = line_hash
+
+        # Видалені рядки прибираються зі сховища: на їхнє місце переноситься останній рядок
+        deleted = sorted((row for rows in unmatched.values() for row in rows), reverse=True)
+        for row in deleted:
+            apply(row, -1).rows.remove(row)
+        for row in deleted:
+            last = store.swap_remove(row)
+            if hashes is not None:
+                hashes[row] = hashes[last]
+                hashes.pop()
+            if last != row:
+                rows = self._class_of_row(row).rows
+                rows[rows.index(last)] = row
+        counts['deleted'] = len(deleted)
+        aggregates.settle(self.get_current_classes())
+
+        self._line_hashes = (header, hashes) if hashes is not None else None
+        self.fingerprint, self._derived, self._index = fingerprint, {'aggregates': aggregates}, None
+        if self.derived_cache is not None and fingerprint is not None:
+            self.derived_cache.put((fingerprint, self.version, 'aggregates'), aggregates)
+        report('success', f"Оновлено учнів: додано {counts['inserted']}, змінено {counts['updated']}, "
+                          f"видалено {counts['deleted']}, без змін {counts['unchanged']}.")
+        return counts
+
 #Фільтрує та повертає лише класи 1-11
     def get_current_classes(self) -> List[SchoolClass]:
         return [cls for cls in self.classes.values() if 1 <= cls.parallel <= 11]
@@ -156,32 +1046,114 @@ class School:
     def get_total_student_count(self) -> int:
         return sum(cls.get_student_count() for cls in self.get_current_classes())
 
-#Інформація для статистики
+#Вторинні індекси; будуються один раз для набору даних і переживають переведення класів
+    def get_index(self) -> StudentIndex:
+        if self._index is None:
+            self._index = StudentIndex(self.classes.values(), self.store)
+        return self._index
+
+#Поточні класи, до яких належать масиви rows індексу (паралель беремо з класу, бо переведення змінює лише її)
+    def _classes_by_slot(self, index: StudentIndex) -> Dict[int, SchoolClass]:
+        by_rows = {id(cls.rows): cls for cls in self.get_current_classes()}
+        return {slot: by_rows[id(rows)] for slot, rows in enumerate(index.slots) if id(rows) in by_rows}
+
+#Пошук учнів за ПІБ (Person.get_full_name) через хеш-індекс
+    def find_students_by_name(self, full_name: str) -> List[Student]:
+        index = self.get_index()
+        classes = self._classes_by_slot(index)
+        result = []
+        for row in index.by_name.get(full_name, []):
+            cls = classes.get(index.row_slot[row])
+            if cls is not None:
+                result.append(self.store.get_student(row, cls.parallel))
+        return result
+
+#Пошук учнів за фільтрами; спершу звужуємо вибірку найвибірковішим індексом, решту умов перевіряємо по рядках
+    def find_students(self, parallel: Optional[int] = None, vertical: Optional[str] = None,
+                      birth_year: Optional[int] = None, min_grade: Optional[float] = None,
+                      max_grade: Optional[float] = None) -> List[Student]:
+        index, store = self.get_index(), self.store
+        classes = self._classes_by_slot(index)
+        if parallel is not None or vertical is not None:
+            classes = {slot: cls for slot, cls in classes.items()
+                       if (parallel is None or cls.parallel == parallel) and (vertical is None or cls.vertical == vertical)}
+
+        if birth_year is not None:
+            candidates = index.range_rows(index.birth_order, index.birth_keys, birth_year, birth_year)
+        elif min_grade is not None or max_grade is not None:
+            candidates = index.range_rows(index.grade_order, index.grade_keys, min_grade, max_grade)
+        else:
+            candidates = [row for slot in classes for row in index.slots[slot]]
+
+        result = []
+        for row in candidates:
+            cls = classes.get(index.row_slot[row])
+            if cls is None: continue
+            grade = store.average_grade[row]
+            if (min_grade is not None and grade < min_grade) or (max_grade is not None and grade > max_grade): continue
+            result.append(store.get_student(row, cls.parallel))
+        return result
+
+#k учнів з найвищою оцінкою (за паралеллю та/або вертикаллю): злиття вже відсортованих списків класів
+    def top_students(self, k: int, parallel: Optional[int] = None, vertical: Optional[str] = None) -> List[Student]:
+        index, store = self.get_index(), self.store
+        grades = store.average_grade
+        selected = [(slot, cls) for slot, cls in self._classes_by_slot(index).items()
+                    if (parallel is None or cls.parallel == parallel) and (vertical is None or cls.vertical == vertical)]
+        parallel_of_slot = {slot: cls.parallel for slot, cls in selected}
+        streams = [index.slot_rows_by_grade[slot] for slot, _ in selected]
+        top_rows = islice(merge(*streams, key=lambda row: -grades[row]), k)
+        return [store.get_student(row, parallel_of_slot[index.row_slot[row]]) for row in top_rows]
+
+#Повертає похідний результат поточної версії школи; якщо відомий відбиток даних, то через спільний кеш
+    def _get_derived(self, kind: str, compute: Callable[[], Any]) -> Any:
+        if kind not in self._derived:
+            if self.derived_cache is not None and self.fingerprint is not None:
+                self._derived[kind] = self.derived_cache.get_or_create((self.fingerprint, self.version, kind), compute)
+            else:
+                self._derived[kind] = compute()
+        return self._derived[kind]
+
+#Групування учнів поточних класів; результат зберігається до наступної зміни школи
+    def get_aggregates(self) -> SchoolAggregates:
+        return self._get_derived('aggregates', lambda: aggregate_classes(self.get_current_classes(), self.store))
+
+#Інформація для статистики (кешується за відбитком даних і версією школи)
+    @timed('get_statistics')
     def get_statistics(self) -> Dict[str, Any]:
+        return self._get_derived('statistics', self._compute_statistics)
+
+#Дані для чотирьох графіків (кешуються так само, як статистика)
+    def get_chart_data(self) -> Dict[str, tuple]:
+        return self._get_derived('charts', lambda: build_chart_data(self.get_aggregates()))
+
+#Розрахунок статистики з результату групування, без окремих проходів
+    def _compute_statistics(self) -> Dict[str, Any]:
         stats: Dict[str, Any] = {'is_valid': False}
-        all_students = self.get_all_students()
-        current_classes = self.get_current_classes()
-        total_students = len(all_students)
+        aggregates = self.get_aggregates()
+        total_students = aggregates.total_students
         stats['total_students'] = total_students
 
-        if total_students == 0 or not current_classes: return stats
+        if total_students == 0 or not aggregates.class_sizes: return stats
         stats['is_valid'] = True
 
 #Створення статистики
-        male_count = sum(1 for s in all_students if s.gender == 'M')
-        class_counts = [cls.get_student_count() for cls in current_classes]
+        male_count = aggregates.by_gender.get('M', 0)
         stats['male_percent'] = (male_count / total_students) * 100
         stats['female_percent'] = ((total_students - male_count) / total_students) * 100
-        stats['avg_students_per_class'] = sum(class_counts) / len(class_counts)
+        stats['avg_students_per_class'] = total_students / len(aggregates.class_sizes)
 
-        max_count, min_count = max(class_counts), min(class_counts)
+        # argmax / argmin з урахуванням однакових значень
+        max_count = max(count for _, count in aggregates.class_sizes)
+        min_count = min(count for _, count in aggregates.class_sizes)
         stats['max_students'] = max_count
-        stats['max_classes'] = ", ".join(
-            cls.get_class_name() for cls in current_classes if cls.get_student_count() == max_count)
+        stats['max_classes'] = ", ".join(name for name, count in aggregates.class_sizes if count == max_count)
         stats['min_students'] = min_count
-        stats['min_classes'] = ", ".join(
-            cls.get_class_name() for cls in current_classes if cls.get_student_count() == min_count)
+        stats['min_classes'] = ", ".join(name for name, count in aggregates.class_sizes if count == min_count)
 
+        stats['grades_by_class'] = {name: aggregates.grade_summary('class', name) for name in aggregates.grades_by_class}
+        stats['grades_by_parallel'] = {p: aggregates.grade_summary('parallel', p)
+                                       for p in sorted(aggregates.grades_by_parallel)}
         return stats
 
 # Відображення статистики в Streamlit
@@ -201,158 +1173,436 @@ class School:
             f"* **Макс. учнів:** **{stats.get('max_students', 0)}** (у класах: {stats.get('max_classes', 'N/A')})\n"
             f"* **Мін. учнів:** **{stats.get('min_students', 0)}** (у класах: {stats.get('min_classes', 'N/A')})")
 
+        with st.expander("Середня оцінка по паралелях"):
+            st.dataframe([{'Паралель': p, 'Учнів': g['count'], 'Середня': round(g['mean'], 2),
+                           'Медіана': round(g['median'], 2), 'P25': round(g['p25'], 2),
+                           'P75': round(g['p75'], 2), 'P90': round(g['p90'], 2)}
+                          for p, g in stats.get('grades_by_parallel', {}).items()], hide_index=True)
+
 #Генерує та відображає графіки Matplotlib у Streamlit
-    def generate_and_display_graphs(self) -> None:
-        all_students = self.get_all_students()
-        student_data_list = [{'parallel': s.parallel, 'vertical': s.vertical,
-                              'birth_year': s.birth_year, 'average_grade': s.average_grade}
-                             for s in all_students]
+    def generate_and_display_graphs(self, renderer: Optional[ChartRenderer] = None) -> None:
+        renderer = renderer if renderer is not None else ChartRenderer()
+        chart_data = self.get_chart_data()
+        images = renderer.render_all(chart_data)
 
         st.header("Графічна візуалізація даних")
         col1, col2 = st.columns(2)
         col3, col4 = st.columns(2)
 
-        #Учні по паралелях
-        parallel_counts = {}
-
-        for s in student_data_list:
-            p = s['parallel']
-
-            if p in parallel_counts:
-                parallel_counts[p] += 1 # Якщо клас уже є, то додаємо 1
-            else:
-                parallel_counts[p] = 1 # Якщо файлу немає, то створюємо і ставимо 1
-        parallels = sorted(parallel_counts.keys())
-        counts = [parallel_counts[p] for p in parallels]
-
-        with col1:
-            st.subheader("Розподіл учнів по паралелях")
-            fig, ax = plt.subplots()
-            ax.bar(parallels, counts, color='purple')
-            ax.set_xlabel("Паралель")
-            ax.set_ylabel("Кількість учнів")
-            ax.set_xticks(parallels)
-            st.pyplot(fig)
-
-        #Середня кількість по вертикалях
-        vertical_stats = {}  # Скільки учнів у кожній вертикалі
-        vertical_class_count = {} # Скільки класів у кожній вертикалі
-        for cls in self.get_current_classes():
-            v = cls.vertical
-            count = cls.get_student_count()
-
-            # Додаємо кількість учнів у вертикалі
-            if v in vertical_stats:
-                vertical_stats[v] += count
-            else:
-                vertical_stats[v] = count
-
-            # Підраховуємо кількість учнів у вертикалі
-            if v in vertical_class_count:
-                vertical_class_count[v] += 1
-            else:
-                vertical_class_count[v] = 1
-
-        #Формуємо списки для графіка
-        verticals = sorted(vertical_stats.keys())
-        avg_counts = [vertical_stats[v]/vertical_class_count[v] for v in verticals]
-
-
-        with col2:
-            st.subheader("Середня к-ть учнів по вертикалях")
-            fig, ax = plt.subplots()
-            ax.bar(verticals, avg_counts, color='red')
-            ax.set_xlabel("Вертикаль")
-            ax.set_ylabel("Сер. кількість учнів")
-            st.pyplot(fig)
-
-        birth_year_counts = {}  # словник: рік народження → кількість учнів
-
-        for s in student_data_list:
-            year = s['birth_year']
-
-            # якщо рік уже є збільшити лічильник
-            if year in birth_year_counts:
-                birth_year_counts[year] += 1
-            else:
-                # якщо немає - створюємо запис
-                birth_year_counts[year] = 1
-
-        # формуємо списки для графіка
-        years = sorted(birth_year_counts.keys())
-        counts_by_year = [birth_year_counts[y] for y in years]
-
-        with col3:
-            st.subheader("Учні за роком народження")
-            fig, ax = plt.subplots()
-            ax.plot(years, counts_by_year, marker='o', linestyle='-', color='black')
-            ax.set_xlabel("Рік народження")
-            ax.set_ylabel("Кількість учнів")
-            ax.set_xticks(years)
-            st.pyplot(fig)
-
-        #Scatter: Оцінка vs Паралель
-        scatter_x = [s['parallel'] for s in student_data_list]
-        scatter_y = [s['average_grade'] for s in student_data_list]
-
-        with col4:
-            st.subheader("Середня оцінка учнів vs Паралель")
-            fig, ax = plt.subplots()
-            ax.scatter(scatter_x, scatter_y, alpha=0.5, color='orange')
-            ax.set_xlabel("Паралель")
-            ax.set_ylabel("Середня оцінка")
-            ax.set_xticks(sorted(list(set(scatter_x))))
-            st.pyplot(fig)
+        for column, kind in zip((col1, col2, col3, col4), chart_data):
+            with column:
+                st.subheader(CHARTS[kind][0])
+                st.image(images[kind], width="stretch")
 
 #Виконує переведення всіх файлів на рік вперед
-    def promote_all_classes(self) -> None:
-        st.info("Виконую переведення всіх класів на рік вперед...")
-        new_classes_dict = {}
-        for x, cls in self.classes.items():
-            cls.promote_class()  # Виклик методу об'єкта
-            if cls.parallel <= 11:
-                new_classes_dict[cls.get_class_name()] = cls
-        self.classes = new_classes_dict
-        st.success(" Переведення завершено.")
+#Вартість - O(кількість класів): учні не переписуються, паралель зберігається лише в класі
+    @timed('promote_all_classes')
+    def promote_all_classes(self, years: int = 1) -> None:
+        report('info', "Виконую переведення всіх класів на рік вперед...")
+        for _ in range(years):
+            new_classes_dict = {}
+            for x, cls in self.classes.items():
+                cls.promote_class()  # Виклик методу об'єкта
+                if cls.parallel <= 11:
+                    new_classes_dict[cls.get_class_name()] = cls
+            self.classes = new_classes_dict
+            self.version += 1
+        self._derived = {}
+        report('success', " Переведення завершено.")
+
+#Прогноз школи на years років уперед (випуск 11-х класів як при переведенні); поточна школа не змінюється
+    @timed('project')
+    def project(self, years: int) -> 'School':
+        projection = School(self.name)
+        projection.store = self.store
+        projection.fingerprint = self.fingerprint
+        projection.version = self.version + years
+        projection.derived_cache = self.derived_cache
+        projection._index = self._index
+        for cls in self.classes.values():
+            projected_class = cls.projected(years)
+            if years == 0 or projected_class.parallel <= 11:
+                projection.classes[projected_class.get_class_name()] = projected_class
+        return projection
+
+#Зберігає школу у двійковий знімок (атомарно, через тимчасовий файл; права як у звичайного нового файлу)
+    def save_snapshot(self, path: str) -> None:
+        with atomic_write(path) as file:
+            write_snapshot(self, file)
+
+#Знімок школи як байти (для st.download_button); будується на кожен виклик і не кешується,
+#бо займає стільки ж пам'яті, скільки вся школа
+    def snapshot_bytes(self) -> bytes:
+        buffer = io.BytesIO()
+        write_snapshot(self, buffer)
+        return buffer.getvalue()
+
+#Відкриває знімок через mmap лише для читання: колонки не копіюються, кілька процесів ділять ті самі сторінки
+    @classmethod
+    def load_snapshot(cls, path: str, verify: bool = False) -> 'School':
+        with open(path, 'rb') as file:
+            mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        return read_snapshot(mapped, verify)
+
+#Відкриває знімок з байтів (наприклад, із завантаженого файлу)
+    @classmethod
+    def from_snapshot_bytes(cls, data: bytes, verify: bool = True) -> 'School':
+        return read_snapshot(data, verify)
+
+#Двійковий знімок школи: заголовок (сигнатура, версія формату, sha256 вмісту, довжина метаданих),
+#метадані JSON (класи, розташування колонок, таблиця рядків) і колонки, вирівняні по 8 байтів
+SNAPSHOT_MAGIC = b'ZSNAP\0'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<6sH32sQ')
+
+def _padding(size: int) -> int:
+    return -size % 8
+
+#Тип елементів колонки (array або memoryview зі знімка)
+def column_typecode(column) -> str:
+    return column.typecode if isinstance(column, array) else column.format
+
+#Записує знімок у файл з можливістю seek (хеш дописується в заголовок після запису вмісту)
+def write_snapshot(school: School, stream) -> None:
+    store = school.store
+    class_list = list(school.classes.values())
+    class_rows = array('I')
+    classes_meta = []
+    for cls in class_list:
+        classes_meta.append([cls.parallel, cls.vertical, len(class_rows), len(cls.rows)])
+        class_rows.extend(cls.rows)
+
+    columns = {name: getattr(store, name) for name in StudentStore.COLUMNS}
+    columns['class_rows'] = class_rows
+    blocks: List[Tuple[str, bytes]] = [(name, column.tobytes()) for name, column in columns.items()]
+    strings_blob = '\0'.join(store.strings).encode('utf-8')
+
+    columns_meta: Dict[str, List[Any]] = {}
+    offset = 0
+    for name, data in blocks:
+        typecode = column_typecode(columns[name])
+        columns_meta[name] = [typecode, offset, len(columns[name])]
+        offset += len(data) + _padding(len(data))
+    meta = json.dumps({
+        'byteorder': sys.byteorder, 'name': school.name, 'version': school.version,
+        'classes': classes_meta, 'columns': columns_meta,
+        'strings': [offset, len(strings_blob), len(store.strings)],
+    }, ensure_ascii=False).encode('utf-8')
+
+    digest = hashlib.sha256()
+    def emit(data: bytes) -> None:
+        digest.update(data)
+        stream.write(data)
+
+    start = stream.tell()
+    stream.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, b'\0' * 32, len(meta)))
+    emit(meta + b'\0' * _padding(len(meta)))
+    for _, data in blocks:
+        emit(data + b'\0' * _padding(len(data)))
+    emit(strings_blob)
+    end = stream.tell()
+    stream.seek(start)
+    stream.write(SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, digest.digest(), len(meta)))
+    stream.seek(end)
+
+#Читає знімок з буфера (bytes або mmap); колонки стають memoryview над буфером без копіювання
+def read_snapshot(buffer, verify: bool = False) -> School:
+    view = memoryview(buffer)
+    if len(view) < SNAPSHOT_HEADER.size:
+        raise ValueError("знімок пошкоджено: надто короткий файл")
+    magic, version, content_hash, meta_size = SNAPSHOT_HEADER.unpack_from(view)
+    if magic != SNAPSHOT_MAGIC:
+        raise ValueError("це не знімок школи")
+    if version != SNAPSHOT_VERSION:
+        raise ValueError(f"непідтримувана версія знімка: {version}")
+    if verify and hashlib.sha256(view[SNAPSHOT_HEADER.size:]).digest() != content_hash:
+        raise ValueError("знімок пошкоджено: хеш вмісту не збігається")
+
+    meta_start = SNAPSHOT_HEADER.size
+    meta = json.loads(bytes(view[meta_start:meta_start + meta_size]).decode('utf-8'))
+    if meta['byteorder'] != sys.byteorder:
+        raise ValueError("знімок створено на платформі з іншим порядком байтів")
+    data_start = meta_start + meta_size + _padding(meta_size)
+
+    columns: Dict[str, memoryview] = {}
+    for name, (typecode, offset, count) in meta['columns'].items():
+        itemsize = array(typecode).itemsize
+        begin = data_start + offset
+        columns[name] = view[begin:begin + count * itemsize].cast(typecode)
+    strings_offset, strings_size, strings_count = meta['strings']
+    begin = data_start + strings_offset
+    strings = bytes(view[begin:begin + strings_size]).decode('utf-8').split('\0') if strings_count else []
+
+    school = School(meta['name'])
+    school.store = StudentStore.from_columns(strings, columns)
+    school.fingerprint = content_hash.hex()
+    school.version = meta.get('version', 0)  # Колонка parallel зберігає паралель до переведень
+    school._snapshot_buffer = buffer
+    class_rows = columns['class_rows']
+    for parallel, vertical, start, count in meta['classes']:
+        cls = SchoolClass(parallel, vertical, school.store)
+        cls.rows = class_rows[start:start + count]
+        school.classes[cls.get_class_name()] = cls
+    return school
+
+#Завантажує одну школу району (виконується в окремому процесі) і повертає лише компактний підсумок:
+#статистику та лічильники, без списків учнів, щоб між процесами передавалося O(класів), а не O(учнів)
+def load_school_summary(name: str, classes_path: str, students_path: str, promote: int = 0) -> Optional[Dict[str, Any]]:
+    school = School(name)
+    with open(classes_path, 'rb') as classes_file, open(students_path, 'rb') as students_file:
+        if not school.load_data_from_csv(iter_csv_rows(classes_file, CLASSES_SCHEMA),
+                                         iter_csv_rows(students_file, STUDENTS_SCHEMA)):
+            return None
+    if promote:
+        school.promote_all_classes(promote)
+    aggregates = school.get_aggregates()
+    return {'name': name, 'statistics': school.get_statistics(), 'class_sizes': aggregates.class_sizes,
+            'by_parallel': aggregates.by_parallel, 'by_gender': aggregates.by_gender,
+            'grade_sum_by_parallel': {p: sum(grades) for p, grades in aggregates.grades_by_parallel.items()}}
+
+#Район: кілька шкіл, що завантажуються паралельно в пулі процесів; зберігаються лише підсумки шкіл
+class District:
+    def __init__(self, name: str = "Район"):
+        self.name: str = name
+        self.summaries: Dict[str, Dict[str, Any]] = {}  #Назва школи -> підсумок з load_school_summary
+
+#Завантаження шкіл (назва, classes.csv, students.csv); назви мають бути унікальні, бо за ними зберігаються підсумки.
+#Без executor створюється пул на кількість ядер
+    @timed('district_load')
+    def load(self, sources: Sequence[Tuple[str, str, str]], promote: int = 0, max_workers: Optional[int] = None,
+             executor: Optional[Executor] = None) -> bool:
+        self.summaries = {}
+        if not sources: return False
+        duplicates = sorted(name for name, count in Counter(name for name, _, _ in sources).items() if count > 1)
+        if duplicates:
+            raise ValueError(f"однакові назви шкіл у районі: {', '.join(duplicates)}")
+        pool = executor or ProcessPoolExecutor(max_workers or min(len(sources), os.cpu_count() or 1))
+        try:
+            futures = [(name, pool.submit(load_school_summary, name, classes_path, students_path, promote))
+                       for name, classes_path, students_path in sources]
+            for name, future in futures:
+                try:
+                    summary = future.result()
+                except Exception as e:
+                    report('error', f"Помилка завантаження школи {name}: {e}")
+                    continue
+                if summary is not None:
+                    self.summaries[name] = summary
+        finally:
+            if executor is None:
+                pool.shutdown()
+        report('success', f"Успішно завантажено {len(self.summaries)} з {len(sources)} шкіл.")
+        return len(self.summaries) == len(sources)
+
+#Статистика району з підсумків шкіл; ключі як у School.get_statistics, класи позначені назвою школи
+    def get_statistics(self) -> Dict[str, Any]:
+        total_students = sum(summary['statistics']['total_students'] for summary in self.summaries.values())
+        stats: Dict[str, Any] = {'is_valid': False, 'total_students': total_students, 'school_count': len(self.summaries)}
+        class_sizes = [(f"{name}: {class_name}", count) for name, summary in self.summaries.items()
+                       for class_name, count in summary['class_sizes']]
+        if total_students == 0 or not class_sizes: return stats
+        stats['is_valid'] = True
+
+        genders: Counter = Counter()
+        by_parallel: Counter = Counter()
+        grade_sums: Counter = Counter()
+        for summary in self.summaries.values():
+            genders.update(summary['by_gender'])
+            by_parallel.update(summary['by_parallel'])
+            grade_sums.update(summary['grade_sum_by_parallel'])
+
+        stats['male_percent'] = (genders.get('M', 0) / total_students) * 100
+        stats['female_percent'] = ((total_students - genders.get('M', 0)) / total_students) * 100
+        stats['avg_students_per_class'] = total_students / len(class_sizes)
+        max_count = max(count for _, count in class_sizes)
+        min_count = min(count for _, count in class_sizes)
+        stats['max_students'] = max_count
+        stats['max_classes'] = ", ".join(name for name, count in class_sizes if count == max_count)
+        stats['min_students'] = min_count
+        stats['min_classes'] = ", ".join(name for name, count in class_sizes if count == min_count)
+        stats['students_by_parallel'] = {p: by_parallel[p] for p in sorted(by_parallel)}
+        stats['mean_grade_by_parallel'] = {p: grade_sums[p] / by_parallel[p] for p in sorted(by_parallel)}
+        stats['students_by_school'] = {name: summary['statistics']['total_students']
+                                       for name, summary in self.summaries.items()}
+        return stats
 
 
 
 # 3. УТИЛІТИ ТА CSV-РОБОТА
 
-#Читає завантажений CSV-файл у список словників
-def read_csv_file(uploaded_file) -> List[Dict[str, Any]]:
+#Обмежений за кількістю записів кеш, що витісняє найдавніше використані (LRU); безпечний для потоків
+class LRUCache:
+    def __init__(self, maxsize: int = 32):
+        self.maxsize: int = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Any, default: Any = None) -> Any:
+        with self._lock:
+            if key not in self._data: return default
+            self._data.move_to_end(key)
+            return self._data[key]
+
+    def put(self, key: Any, value: Any) -> None:
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+#Повертає значення з кешу або обчислює його (обчислення виконується поза блокуванням)
+    def get_or_create(self, key: Any, factory: Callable[[], Any]) -> Any:
+        missing = object()
+        value = self.get(key, missing)
+        if value is missing:
+            value = factory()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+#Відбиток вмісту файлів (sha256), файли читаються частинами
+def content_fingerprint(*files, chunk_size: int = 1 << 20) -> str:
+    digest = hashlib.sha256()
+    for file in files:
+        file.seek(0)
+        for chunk in iter(lambda: file.read(chunk_size), b''):
+            digest.update(chunk)
+        file.seek(0)
+        digest.update(b'\0')  # Роздільник між файлами
+    return digest.hexdigest()
+
+#Схеми колонок CSV-файлів: назва колонки -> функція перетворення значення
+CLASSES_SCHEMA: Dict[str, Callable[[str], Any]] = {'parallel': int, 'vertical': str}
+STUDENTS_SCHEMA: Dict[str, Callable[[str], Any]] = {
+    'last_name': str, 'first_name': str, 'middle_name': str, 'birth_year': int,
+    'gender': str, 'average_grade': float, 'parallel': int, 'vertical': str
+}
+
+#Ціле число або 0 для порожньої клітинки (стаж, що не стосується посади)
+def int_or_zero(value: str) -> int:
+    return int(value) if value else 0
+
+STAFF_SCHEMA: Dict[str, Callable[[str], Any]] = {
+    'last_name': str, 'first_name': str, 'middle_name': str, 'position': str,
+    'pedagogical_experience': int_or_zero, 'management_experience': int_or_zero, 'total_experience': int_or_zero
+}
+
+#Потоково читає CSV-файл за схемою: файл декодується поступово, рядки не накопичуються в пам'яті.
+#Розбір вимірюється окремим етапом iter_csv_rows (лише час читання рядків, без часу того, хто їх споживає)
+def iter_csv_rows(uploaded_file, schema: Dict[str, Callable[[str], Any]]) -> Iterator[Dict[str, Any]]:
+    uploaded_file.seek(0)
+    text = io.TextIOWrapper(uploaded_file, encoding="utf-8", newline='')
+    try:
+        reader = csv.reader(text)
+        rows = parse_csv_records(reader, [key.strip() for key in next(reader, [])], schema)
+        recorder = get_perf_recorder()
+        yield from recorder.timed_iter('iter_csv_rows', rows) if recorder.enabled else rows
+    finally:
+        text.detach()  # Не закриваємо завантажений файл разом з обгорткою
+
+#Перетворює записи csv.reader на словники за схемою; header - назви колонок з першого рядка файлу
+def parse_csv_records(records: Iterable[List[str]], header: Sequence[str],
+                      schema: Dict[str, Callable[[str], Any]]) -> Iterator[Dict[str, Any]]:
+    missing = [key for key in schema if key not in header]
+    if missing:
+        raise ValueError(f"відсутні колонки: {', '.join(missing)}")
+    columns = [(key, header.index(key), convert) for key, convert in schema.items()]
+    for row in records:
+        if not row: continue  # Пропускаємо порожні рядки, як DictReader
+        yield {key: convert(row[index].strip()) for key, index, convert in columns}
+
+#Повертає рядки CSV-файлу пакетами по batch_size словників
+def iter_csv_batches(uploaded_file, schema: Dict[str, Callable[[str], Any]],
+                     batch_size: int = 10000) -> Iterator[List[Dict[str, Any]]]:
+    rows = iter_csv_rows(uploaded_file, schema)
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch: return
+        yield batch
+
+#Читає завантажений CSV-файл у список словників (за схемою або з автовизначенням типів)
+@timed('read_csv_file')
+def read_csv_file(uploaded_file, schema: Optional[Dict[str, Callable[[str], Any]]] = None) -> List[Dict[str, Any]]:
+    if schema is not None:
+        return list(iter_csv_rows(uploaded_file, schema))
     data = []
-    content = uploaded_file.getvalue().decode("utf-8")
-    reader = csv.DictReader(content.splitlines())
-    for row in reader:
-        processed_row: Dict[str, Any] = {}
-        for key, value in row.items():
-            key, value = key.strip(), value.strip()
-            # Конвертація в число (int або float)
-            if value.replace('.', '', 1).isdigit():
-                processed_row[key] = float(value) if '.' in value else int(value)
-            else:
-                processed_row[key] = value
-        data.append(processed_row)
+    uploaded_file.seek(0)
+    text = io.TextIOWrapper(uploaded_file, encoding="utf-8", newline='')
+    try:
+        for row in csv.DictReader(text):
+            processed_row: Dict[str, Any] = {}
+            for key, value in row.items():
+                key, value = key.strip(), value.strip()
+                # Конвертація в число (int або float)
+                if value.replace('.', '', 1).isdigit():
+                    processed_row[key] = float(value) if '.' in value else int(value)
+                else:
+                    processed_row[key] = value
+            data.append(processed_row)
+    finally:
+        text.detach()
     return data
 
-#Записує список словників у фізичний CSV-файл
-def write_csv_file(data: List[Dict[str, Any]], filename: str) -> None:
-    if not data: return
-
-    # Збір всіх можливих ключів для уникнення помилки 'dict contains fields not in fieldnames'
-    all_keys = set()
-    for row in data: all_keys.update(row.keys())
-
-    fieldnames = ['ПІБ', 'Посада', 'Базова Ставка', 'Розрахована Зарплата (грн)', #Створення повного впорядкованого списку
-                  'Педагогічний Стаж', 'Стаж Керування', 'Загальний Досвід']
-
-    final_fieldnames = [key for key in fieldnames if key in all_keys]
-
-    with open(filename, 'w', newline='', encoding='utf-8') as csvfile:
-        writer = csv.DictWriter(csvfile, fieldnames=final_fieldnames, restval='', extrasaction='ignore')
-        writer.writeheader()
-        writer.writerows(data)
+#Повний впорядкований список колонок таблиці зарплат
+SALARY_FIELDNAMES = ['ПІБ', 'Посада', 'Базова Ставка', 'Розрахована Зарплата (грн)',
+                     'Педагогічний Стаж', 'Стаж Керування', 'Загальний Досвід']
+
+#Колонки таблиці зарплат для набору посад (визначаються наперед, без перегляду всіх рядків)
+def salary_fieldnames(positions: Iterable[str]) -> List[str]:
+    present = set(SALARY_FIELDNAMES[:4])
+    for position in set(positions):
+        employee_class = EMPLOYEE_CLASSES.get(position)
+        if employee_class is None: continue
+        if issubclass(employee_class, Teacher): present.add('Педагогічний Стаж')
+        if issubclass(employee_class, Director): present.add('Стаж Керування')
+        if issubclass(employee_class, SecurityGuard): present.add('Загальний Досвід')
+    return [key for key in SALARY_FIELDNAMES if key in present]
+
+#Записує рядки в текстовий потік за один прохід
+def write_csv_rows(rows: Iterable[Dict[str, Any]], fieldnames: List[str], stream) -> None:
+    writer = csv.DictWriter(stream, fieldnames=fieldnames, restval='', extrasaction='ignore')
+    writer.writeheader()
+    writer.writerows(rows)
+
+#Повертає CSV як байти (для st.download_button) без проміжного файлу на диску
+def csv_to_bytes(rows: Iterable[Dict[str, Any]], fieldnames: List[str]) -> bytes:
+    buffer = io.BytesIO()
+    text = io.TextIOWrapper(buffer, encoding='utf-8', newline='')
+    write_csv_rows(rows, fieldnames, text)
+    text.flush()
+    text.detach()
+    return buffer.getvalue()
+
+#Записує список словників у фізичний CSV-файл (атомарно: через тимчасовий файл у тій самій папці)
+def write_csv_file(data: Iterable[Dict[str, Any]], filename: str, fieldnames: Optional[List[str]] = None,
+                   file_mode: int = DEFAULT_FILE_MODE) -> None:
+    if fieldnames is None:
+        data = list(data)
+        if not data: return
+
+        # Збір всіх можливих ключів для уникнення помилки 'dict contains fields not in fieldnames'
+        all_keys = set()
+        for row in data: all_keys.update(row.keys())
+        fieldnames = [key for key in SALARY_FIELDNAMES if key in all_keys]
+
+    with atomic_write(filename, file_mode) as file, \
+            io.TextIOWrapper(file, encoding='utf-8', newline='') as csvfile:
+        write_csv_rows(data, fieldnames, csvfile)
+
+#Рядок таблиці працівника; якщо передано salary, додається розрахована зарплата
+def employee_row(emp: Employee, salary: Optional[float] = None) -> Dict[str, Any]:
+    row: Dict[str, Any] = {'ПІБ': emp.get_full_name(), 'Посада': emp.position, 'Базова Ставка': emp.base_salary}
+    if salary is not None: row['Розрахована Зарплата (грн)'] = f"{salary:.2f}"
+    if isinstance(emp, Teacher): row['Педагогічний Стаж'] = emp.pedagogical_experience
+    if isinstance(emp, Director): row['Стаж Керування'] = emp.management_experience
+    if isinstance(emp, SecurityGuard): row['Загальний Досвід'] = emp.total_experience
+    return row
 
 #Створює програмно об'єкти працівників
 def get_employees_data() -> List[Employee]:
@@ -367,6 +1617,72 @@ def get_employees_data() -> List[Employee]:
 
 # 4. СТОРІНКА СЦЕНАРІЮ 1: КЛАСИ ТА УЧНІ
 
+#Спільний для всіх сесій кеш статистики та даних графіків (переживає перезапуски сценарію)
+@cache_resource
+def get_derived_cache() -> LRUCache:
+    return LRUCache(maxsize=64)
+
+#Кількість процесів спільного пулу малювання графіків (0 або 1 - малювати послідовно).
+#Потоки не прискорюють малювання: matplotlib тримає GIL майже весь час (див. render_all_* у benchmark.py)
+CHART_RENDER_WORKERS = min(4, os.cpu_count() or 1)
+
+#Спільний для всіх сесій кеш намальованих графіків та обмежений пул процесів для малювання.
+#Процеси запускаються через spawn, бо fork багатопотокового сервера Streamlit небезпечний. Під "streamlit run"
+#цей файл виконується як __main__, тож draw_chart береться з модуля, імпортованого за назвою файлу:
+#лише так процеси пулу знайдуть функцію після pickle
+@cache_resource
+def get_chart_renderer() -> ChartRenderer:
+    if CHART_RENDER_WORKERS < 2:
+        return ChartRenderer(LRUCache(maxsize=128))
+    module = importlib.import_module(os.path.splitext(os.path.basename(__file__))[0])
+    executor = ProcessPoolExecutor(max_workers=CHART_RENDER_WORKERS, mp_context=multiprocessing.get_context('spawn'))
+    return ChartRenderer(LRUCache(maxsize=128), executor=executor, draw=module.draw_chart)
+
+#Спільні для всіх сесій завантажені школи за відбитком вмісту; ці об'єкти ніколи не змінюються
+@cache_resource
+def get_shared_schools() -> LRUCache:
+    return LRUCache(maxsize=8)
+
+#Повертає спільну (лише для читання) школу для завантажених файлів; той самий вміст розбирається один раз на процес
+#Якщо передано попередню школу з тими самими класами, students.csv застосовується до її копії інкрементно
+def load_school(classes_file, students_file, previous: Optional[School] = None) -> Optional[School]:
+    fingerprint = content_fingerprint(classes_file, students_file)
+    shared_schools = get_shared_schools()
+    school = shared_schools.get(fingerprint)
+    if school is not None:
+        return school
+
+    if previous is not None and previous.version == 0:
+        class_names = [f"{row['parallel']}-{row['vertical']}" for row in iter_csv_rows(classes_file, CLASSES_SCHEMA)]
+        if class_names == list(previous.classes):
+            school = previous.copy()
+            if school.update_students_from_csv(students_file, fingerprint) is None:
+                return None
+            shared_schools.put(fingerprint, school)
+            return school
+
+    school = School("Гімназія 'Прогрес'")
+    school.derived_cache = get_derived_cache()
+    classes_data = iter_csv_rows(classes_file, CLASSES_SCHEMA)
+    students_data = iter_csv_rows(students_file, STUDENTS_SCHEMA)
+    if not school.load_data_from_csv(classes_data, students_data, fingerprint):
+        return None
+    shared_schools.put(fingerprint, school)
+    return school
+
+#Прив'язує сесію до спільної школи: сесія зберігає лише посилання та власну кількість переведень
+def use_shared_school(base_school: School, years_promoted: int = 0) -> None:
+    st.session_state['base_school'] = base_school
+    st.session_state['years_promoted'] = years_promoted
+    st.session_state['school'] = base_school.project(years_promoted) if years_promoted else base_school
+    st.session_state['data_loaded'] = True
+    st.session_state['promoted'] = years_promoted > 0
+
+#Рядок таблиці з даними учня для st.dataframe
+def student_row(student: Student) -> Dict[str, Any]:
+    return {'ПІБ': student.get_full_name(), 'Клас': f"{student.parallel}-{student.vertical}",
+            'Рік народження': student.birth_year, 'Стать': student.gender, 'Оцінка': student.average_grade}
+
 #Сторінка Streamlit для першого сценарію
 def page_scenario_1() -> None:
     st.header("Сценарій 1: Статистика, Графіки та Переведення класів")
@@ -375,7 +1691,6 @@ def page_scenario_1() -> None:
         st.session_state['school'] = School("Гімназія 'Прогрес'")
         st.session_state['data_loaded'] = False
         st.session_state['promoted'] = False
-    school = st.session_state['school']
 
 
     st.subheader("1. Завантаження даних")
@@ -384,16 +1699,37 @@ def page_scenario_1() -> None:
     classes_file = st.file_uploader("Завантажте classes.csv", type=['csv'], key="classes_uploader")
     students_file = st.file_uploader("Завантажте students.csv", type=['csv'], key="students_uploader")
     can_load = classes_file and students_file
+    incremental = st.session_state.get('data_loaded', False) and st.checkbox(
+        "Оновити інкрементно (лише змінені рядки)", value=True, key="incremental_reload")
 
     if can_load and st.button("Ініціалізувати ООП об'єкти", key="load_s1_button"):
         try:
-            classes_data, students_data = read_csv_file(classes_file), read_csv_file(students_file)
-            st.session_state['data_loaded'] = school.load_data_from_csv(classes_data, students_data)
-            st.session_state['promoted'] = False
+            school = load_school(classes_file, students_file,
+                                 st.session_state.get('base_school') if incremental else None)
+            if school is not None:
+                use_shared_school(school)
+            else:
+                st.session_state['data_loaded'] = False
             st.rerun()
         except Exception as e:
             st.error(f"Помилка завантаження/обробки: {e}. Перевірте формат даних.")
 
+    snapshot_file = st.file_uploader("Або завантажте знімок школи (.zsnap)", type=['zsnap'], key="snapshot_uploader")
+    if snapshot_file and st.button("Відкрити знімок", key="load_snapshot_button"):
+        try:
+            data = snapshot_file.getvalue()
+            shared_schools = get_shared_schools()
+            school = shared_schools.get(hashlib.sha256(data[SNAPSHOT_HEADER.size:]).hexdigest())
+            if school is None:
+                school = School.from_snapshot_bytes(data)
+                school.derived_cache = get_derived_cache()
+                shared_schools.put(school.fingerprint, school)
+            use_shared_school(school)
+            st.rerun()
+        except ValueError as e:
+            st.error(f"Помилка відкриття знімка: {e}.")
+
+    school = st.session_state['school']
     if st.session_state['data_loaded']:
 
         stats = school.get_statistics()
@@ -402,19 +1738,60 @@ def page_scenario_1() -> None:
         else:
             School.display_statistics(stats, "ОНОВЛЕНА")  # Теж виклик статичного методу
 
-        school.generate_and_display_graphs()  # Крок 3
+        school.generate_and_display_graphs(get_chart_renderer())  # Крок 3
 
         st.subheader("4. Переведення класів")
 
         if st.button("Перевести класи на рік вперед", key="promote_button"):
-            school.promote_all_classes()
-            st.session_state['promoted'] = True
+            # Спільна школа не змінюється: сесія лише рахує роки і будує власне представлення (O(класів))
+            use_shared_school(st.session_state['base_school'], st.session_state['years_promoted'] + 1)
             st.rerun()
 
+        with st.expander("Прогноз на кілька років (без зміни поточних даних)"):
+            years = st.number_input("Кількість років", min_value=1, max_value=11, value=1, key="projection_years")
+            School.display_statistics(school.project(int(years)).get_statistics(), f"ПРОГНОЗНА (+{int(years)})")
+
+        with st.expander("Пошук учнів"):
+            full_name = st.text_input("ПІБ учня", key="search_name")
+            if full_name:
+                found = school.find_students_by_name(full_name.strip())
+                if found:
+                    st.dataframe([student_row(s) for s in found], hide_index=True)
+                else:
+                    st.info("Учня не знайдено.")
+            # Найкращі учні шукаються лише після надсилання форми: запит будує індекс учнів школи
+            with st.form("top_students_form"):
+                top_cols = st.columns(3)
+                top_parallel = top_cols[0].number_input("Паралель", min_value=1, max_value=11, value=9,
+                                                        key="top_parallel")
+                top_vertical = top_cols[1].text_input("Вертикаль (необов'язково)", key="top_vertical")
+                top_k = top_cols[2].number_input("Скільки учнів", min_value=1, max_value=100, value=5, key="top_k")
+                submitted = st.form_submit_button("Знайти найкращих учнів")
+            if submitted:
+                top = school.top_students(int(top_k), int(top_parallel), top_vertical.strip() or None)
+                st.dataframe([student_row(s) for s in top], hide_index=True)
+
+        # Знімок будується лише після натискання кнопки, а не на кожному перезапуску сторінки
+        st.download_button("Зберегти знімок школи (.zsnap)", data=school.snapshot_bytes,
+                           file_name='school.zsnap', mime='application/octet-stream', key="snapshot_download")
+
 
 
 # 5. СТОРІНКА СЦЕНАРІЮ 2: ЗАРПЛАТИ
 
+#Скільки рядків таблиці зарплат показувати на сторінці (файл містить усі)
+PAYROLL_PREVIEW_ROWS = 1000
+
+#Спільні для всіх сесій розібрані штати за відбитком вмісту staff.csv
+@cache_resource
+def get_shared_payrolls() -> LRUCache:
+    return LRUCache(maxsize=4)
+
+#Повертає розібраний штат; той самий файл розбирається один раз на процес, а не на кожному перезапуску сторінки
+def load_payroll(staff_file) -> PayrollBatch:
+    return get_shared_payrolls().get_or_create(
+        content_fingerprint(staff_file), lambda: PayrollBatch.from_rows(iter_csv_rows(staff_file, STAFF_SCHEMA)))
+
 #Сторінка Streamlit для другого сценарію
 def page_scenario_2() -> None:
     st.header("Сценарій 2: Керування зарплатами працівників")
@@ -422,43 +1799,54 @@ def page_scenario_2() -> None:
     employees = get_employees_data()  # Крок 1
     st.subheader("1. Ініціалізовані працівники")
 
-    employees_df = []
-    for emp in employees:
-        row = {'ПІБ': emp.get_full_name(), 'Посада': emp.position, 'Базова Ставка': emp.base_salary}
-        if isinstance(emp, Teacher): row['Педагогічний Стаж'] = emp.pedagogical_experience
-        if isinstance(emp, Director): row['Стаж Керування'] = emp.management_experience
-        if isinstance(emp, SecurityGuard): row['Загальний Досвід'] = emp.total_experience
-        employees_df.append(row)
-    st.dataframe(employees_df, hide_index=True)
+    staff_file = st.file_uploader("Завантажте штат staff.csv (необов'язково)", type=['csv'], key="staff_uploader")
+    batch: Optional[PayrollBatch] = None
+    if staff_file:
+        try:
+            batch = load_payroll(staff_file)
+        except Exception as e:
+            st.error(f"Помилка завантаження штату: {e}. Перевірте формат даних.")
+
+    if batch is not None:
+        st.dataframe([{'Посада': position, 'Кількість': count}
+                      for position, count in Counter(batch.positions).items()], hide_index=True)
+    else:
+        employees_df = [employee_row(emp) for emp in employees]
+        st.dataframe(employees_df, hide_index=True)
 
     st.subheader("2. Розрахунок зарплат") # Поліморфізм
+    save_copy = st.checkbox("Також зберегти копію salaries.csv на сервері", key="save_salaries_copy")
 
     if st.button("Розрахувати зарплати"):
 
-        salary_data: List[Dict[str, Any]] = []
-        for emp in employees:
-            salary = emp.calculate_salary()  # Крок 2: Поліморфний виклик
-            row = {
-                'ПІБ': emp.get_full_name(), 'Посада': emp.position, 'Базова Ставка': emp.base_salary,
-                'Розрахована Зарплата (грн)': f"{salary:.2f}"
-            }
-            if isinstance(emp, Teacher): row['Педагогічний Стаж'] = emp.pedagogical_experience
-            if isinstance(emp, Director): row['Стаж Керування'] = emp.management_experience
-            if isinstance(emp, SecurityGuard): row['Загальний Досвід'] = emp.total_experience
-            salary_data.append(row)
+        if batch is not None:
+            batch.calculate()  # Крок 2: формула кожного класу для всієї групи посади
+            salary_rows: Callable[[], Iterable[Dict[str, Any]]] = batch.iter_rows
+            fieldnames = salary_fieldnames(batch.positions)
+        else:
+            salary_data: List[Dict[str, Any]] = []
+            with get_perf_recorder().stage('payroll'):
+                for emp in employees:
+                    salary = emp.calculate_salary()  # Крок 2: Поліморфний виклик
+                    salary_data.append(employee_row(emp, salary))
+            salary_rows = lambda: salary_data
+            fieldnames = salary_fieldnames(emp.position for emp in employees)
 
         st.success("Розрахунок завершено.")
-        st.dataframe(salary_data, hide_index=True)
+        st.dataframe(list(islice(salary_rows(), PAYROLL_PREVIEW_ROWS)), hide_index=True)
 
-        # 3. Збереження таблиці розрахованих зарплат у файл CSV
+        # 3. Таблиця розрахованих зарплат у CSV: одразу в пам'ять, без спільного файлу в робочій папці
         try:
-            write_csv_file(salary_data, 'salaries.csv')
-            with open('salaries.csv', 'rb') as f:
-                st.download_button(
-                    label="Зберегти таблицю зарплат у salaries.csv (Крок 3)",
-                    data=f.read(), file_name='salaries.csv', mime='text/csv',
-                )
-            st.info("Файл salaries.csv створено та готовий до завантаження.")
+            csv_bytes = csv_to_bytes(salary_rows(), fieldnames)
+            st.download_button(
+                label="Зберегти таблицю зарплат у salaries.csv (Крок 3)",
+                data=csv_bytes, file_name='salaries.csv', mime='text/csv',
+            )
+            if save_copy:
+                session_id = st.session_state.setdefault('session_id', uuid.uuid4().hex)
+                path = os.path.join(tempfile.gettempdir(), f"salaries-{session_id}.csv")
+                write_csv_file(salary_rows(), path, fieldnames, PRIVATE_FILE_MODE)
+                st.info(f"Копію таблиці збережено у {path}.")
         except Exception as e:
             st.error(f"Помилка при записі файлу: {e}. Перевірте права доступу до папки.")
 
@@ -466,6 +1854,9 @@ def page_scenario_2() -> None:
 
 # 6. ГОЛОВНА ФУНКЦІЯ STREAMLIT
 
+#Скільки останніх вимірювань показувати в панелі продуктивності
+PERF_PANEL_ROWS = 30
+
 #Головна функція, яка відповідає за навігацію між сценаріями
 def main():
     st.set_page_config(layout="wide", page_title="Залікова робота: Школа")
@@ -478,14 +1869,148 @@ def main():
 
     st.title("Залікова робота з програмування: Керування школою")
 
+    perf = get_perf_recorder()
+    display_perf_settings(perf)
+
     if selected_page == "Сценарій 1: Класи та Учні":
         page_scenario_1()
     elif selected_page == "Сценарій 2: Зарплати Працівників":
         page_scenario_2()
 
+    if perf.enabled:
+        display_perf_panel(perf)
+
+#Налаштування вимірювань для всього процесу: змінюються лише явним кліком, звичайні перезапуски їх не чіпають
+def display_perf_settings(perf: PerfRecorder) -> None:
+    def apply() -> None:
+        perf.set_enabled(st.session_state['perf_enabled'], st.session_state['perf_memory'])
+
+    # Прапорці кожної сесії показують поточний стан процесу, а не власне збережене значення
+    st.session_state['perf_enabled'] = perf.enabled
+    st.session_state['perf_memory'] = perf.trace_memory
+    with st.sidebar.expander("Адміністрування: вимірювання етапів"):
+        st.caption("Налаштування спільні для всіх користувачів сервера.")
+        st.checkbox("Записувати етапи", key="perf_enabled", on_change=apply)
+        st.checkbox("Також пам'ять (tracemalloc, сповільнює всі сесії)", key="perf_memory", on_change=apply,
+                    disabled=not perf.enabled)
+
+#Останні вимірювання етапів у бічній панелі та їх експорт у JSON lines
+def display_perf_panel(perf: PerfRecorder, count: int = PERF_PANEL_ROWS) -> None:
+    with st.sidebar.expander("Вимірювання етапів", expanded=True):
+        st.dataframe([{'Етап': r['stage'], 'мс': round(r['seconds'] * 1000, 2),
+                       'Виділено, КіБ': round(r.get('alloc_bytes', 0) / 1024, 1),
+                       'Пік, КіБ': round(r.get('peak_bytes', 0) / 1024, 1)}
+                      for r in reversed(perf.last(count))], hide_index=True)
+        st.download_button("Експорт (JSON lines)", data=perf.export_jsonl(), file_name='perf.jsonl',
+                           mime='application/jsonl', key="perf_export")
+
+
+
+# 7. КОМАНДНИЙ РЯДОК (пакетний режим без Streamlit)
+
+#Текстове представлення статистики для консолі
+def format_statistics(stats: Dict[str, Any], title: str) -> str:
+    if not stats.get('is_valid', False):
+        return f"{title} СТАТИСТИКА ШКОЛИ\nНедостатньо даних для розрахунку статистики."
+    return "\n".join([
+        f"{title} СТАТИСТИКА ШКОЛИ",
+        f"Усього учнів: {stats['total_students']}",
+        f"Середня к-ть учнів/клас: {stats['avg_students_per_class']:.2f}",
+        f"Розподіл: {stats['male_percent']:.1f}% / {stats['female_percent']:.1f}%",
+        f"Макс. учнів: {stats['max_students']} (у класах: {stats['max_classes']})",
+        f"Мін. учнів: {stats['min_students']} (у класах: {stats['min_classes']})",
+    ])
+
+#Пакетний запуск: завантаження CSV або знімка, статистика, переведення, зарплати та запис результатів
+def cli_main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Керування школою: пакетний режим без Streamlit")
+    parser.add_argument('--classes', help="шлях до classes.csv")
+    parser.add_argument('--students', help="шлях до students.csv")
+    parser.add_argument('--snapshot', help="шлях до знімка школи (.zsnap) замість CSV")
+    parser.add_argument('--promote', type=int, default=0, metavar='N', help="перевести класи на N років уперед")
+    parser.add_argument('--stats-json', help="записати статистику у JSON-файл")
+    parser.add_argument('--save-snapshot', help="зберегти знімок школи після переведення")
+    parser.add_argument('--staff', help="штат працівників staff.csv для розрахунку зарплат")
+    parser.add_argument('--salaries-out', help="записати таблицю зарплат у CSV (без --staff - вбудовані працівники)")
+    parser.add_argument('--perf-log', help="записати вимірювання етапів у файл JSON lines")
+    parser.add_argument('--district', nargs='+', metavar='DIR',
+                        help="папки шкіл району (у кожній classes.csv і students.csv) для спільної статистики")
+    parser.add_argument('--workers', type=int, help="кількість процесів для завантаження району")
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO, format='%(message)s')
+    if args.perf_log:
+        get_perf_recorder().set_enabled(True, trace_memory=True)
+
+    if args.snapshot:
+        school = School.load_snapshot(args.snapshot)
+    elif args.classes and args.students:
+        school = School()
+        with open(args.classes, 'rb') as classes_file, open(args.students, 'rb') as students_file:
+            if not school.load_data_from_csv(iter_csv_rows(classes_file, CLASSES_SCHEMA),
+                                             iter_csv_rows(students_file, STUDENTS_SCHEMA)):
+                return 1
+    else:
+        school = None
+
+    if school is not None:
+        print(format_statistics(school.get_statistics(), "ПОЧАТКОВА"))
+        if args.promote:
+            school.promote_all_classes(args.promote)
+            print(format_statistics(school.get_statistics(), "ОНОВЛЕНА"))
+        if args.stats_json:
+            with open(args.stats_json, 'w', encoding='utf-8') as file:
+                json.dump(school.get_statistics(), file, ensure_ascii=False, indent=2)
+        if args.save_snapshot:
+            school.save_snapshot(args.save_snapshot)
+
+    if args.district:
+        district = District()
+        # Школа називається як її папка; якщо назви папок збігаються, то повним шляхом
+        names = [os.path.basename(os.path.normpath(directory)) for directory in args.district]
+        names = [name if names.count(name) == 1 else os.path.normpath(directory)
+                 for name, directory in zip(names, args.district)]
+        sources = [(name, os.path.join(directory, 'classes.csv'), os.path.join(directory, 'students.csv'))
+                   for name, directory in zip(names, args.district)]
+        try:
+            if not district.load(sources, args.promote, args.workers):
+                return 1  # Помилки окремих шкіл уже виведено
+        except ValueError as e:
+            report('error', f"Помилка: {e}")
+            return 1
+        stats = district.get_statistics()
+        print(format_statistics(stats, "РАЙОННА"))
+        print(f"Шкіл у районі: {stats['school_count']}")
+        if args.stats_json and school is None:
+            with open(args.stats_json, 'w', encoding='utf-8') as file:
+                json.dump(stats, file, ensure_ascii=False, indent=2)
+
+    if args.staff or args.salaries_out:
+        if args.staff:
+            with open(args.staff, 'rb') as staff_file:
+                batch = PayrollBatch.from_rows(iter_csv_rows(staff_file, STAFF_SCHEMA))
+            batch.calculate()
+            rows, fieldnames = batch.iter_rows(), salary_fieldnames(batch.positions)
+        else:
+            employees = get_employees_data()
+            with get_perf_recorder().stage('payroll'):
+                rows = [employee_row(emp, emp.calculate_salary()) for emp in employees]
+            fieldnames = salary_fieldnames(emp.position for emp in employees)
+        write_csv_file(rows, args.salaries_out or 'salaries.csv', fieldnames)
+        print(f"Таблицю зарплат записано у {args.salaries_out or 'salaries.csv'}")
 
-if __name__ == "__main__":
+    if args.perf_log:
+        with open(args.perf_log, 'a', encoding='utf-8') as file:
+            file.write(get_perf_recorder().export_jsonl())
+    if school is None and not (args.district or args.staff or args.salaries_out):
+        parser.print_help()
+    return 0
 
-    main()
+
+if __name__ == "__main__":
+    # "streamlit run Zalik.py" виконує файл уже з імпортованим streamlit, "python Zalik.py ..." - пакетний режим
+    if 'streamlit' in sys.modules:
+        main()
+    else:
+        sys.exit(cli_main())
 
 
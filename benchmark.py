@@ -0,0 +1,213 @@
+import argparse
+import gc
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+import Zalik
+from generate_data import generate_dataset
+
+# НАБІР БЕНЧМАРКІВ
+# Вимірює час і пікову пам'ять основних етапів Zalik.py на синтетичних даних різного розміру
+# і зберігає результати в JSON, щоб порівнювати запуски між собою
+
+#Вимірює етап: найкращий час із repeats запусків і пікову пам'ять (tracemalloc) окремим запуском.
+#setup готує свіжий вхід для кожного запуску і до вимірювання не входить
+def measure(setup: Callable[[], Any], run: Callable[[Any], Any], repeats: int, memory: bool) -> Dict[str, float]:
+    times = []
+    for _ in range(repeats):
+        argument = setup()
+        gc.collect()
+        start = time.perf_counter()
+        run(argument)
+        times.append(time.perf_counter() - start)
+    result = {'seconds': min(times)}
+    if memory:
+        argument = setup()
+        gc.collect()
+        tracemalloc.start()
+        run(argument)
+        result['peak_bytes'] = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+    return result
+
+#Школа, завантажена з файлів набору даних
+def load_school(paths: Dict[str, str]) -> Zalik.School:
+    school = Zalik.School()
+    with open(paths['classes'], 'rb') as classes_file, open(paths['students'], 'rb') as students_file:
+        school.load_data_from_csv(Zalik.iter_csv_rows(classes_file, Zalik.CLASSES_SCHEMA),
+                                  Zalik.iter_csv_rows(students_file, Zalik.STUDENTS_SCHEMA))
+    return school
+
+#Копія школи без закешованих результатів (учні спільні, копіюються лише класи)
+def fresh_school(school: Zalik.School) -> Zalik.School:
+    return school.project(0)
+
+def read_students(paths: Dict[str, str]) -> None:
+    with open(paths['students'], 'rb') as file:
+        Zalik.read_csv_file(file)
+
+def stream_students(paths: Dict[str, str]) -> None:
+    with open(paths['students'], 'rb') as file:
+        for _ in Zalik.iter_csv_rows(file, Zalik.STUDENTS_SCHEMA):
+            pass
+
+#Копія students.csv з кількома змінами: змінена оцінка, видалений рядок і новий учень у кінці
+def write_modified_students(source: str, target: str, changed: int = 3) -> None:
+    with open(source, encoding='utf-8', newline='') as src, open(target, 'w', encoding='utf-8', newline='') as dst:
+        header = next(src)
+        dst.write(header)
+        last = None
+        for number, line in enumerate(src):
+            if number < changed:
+                fields = line.rstrip('\r\n').split(',')
+                fields[5] = '1.0' if fields[5] != '1.0' else '2.0'
+                line = ','.join(fields) + '\n'
+            elif number == changed:
+                continue
+            dst.write(line)
+            last = line
+        if last is not None:
+            fields = last.rstrip('\r\n').split(',')
+            fields[0] = 'Новенька'
+            dst.write(','.join(fields) + '\n')
+
+#Інкрементне оновлення: копія спільної школи + лише змінені рядки students.csv
+def update_school(base: Zalik.School, students_path: str) -> Zalik.School:
+    school = base.copy()
+    with open(students_path, 'rb') as file:
+        school.update_students_from_csv(file)
+    school.get_statistics()
+    return school
+
+#Повне перезавантаження зміненого students.csv
+def reload_school(paths: Dict[str, str]) -> Zalik.School:
+    school = load_school(paths)
+    school.get_statistics()
+    return school
+
+#Школа з уже порахованими хешами рядків (так виглядає школа після першого інкрементного оновлення)
+def warm_school(school: Zalik.School, paths: Dict[str, str]) -> Zalik.School:
+    warm = update_school(school, paths['students'])
+    warm.fingerprint = None
+    return warm
+
+def load_staff(paths: Dict[str, str]) -> Zalik.PayrollBatch:
+    with open(paths['staff'], 'rb') as file:
+        return Zalik.PayrollBatch.from_rows(Zalik.iter_csv_rows(file, Zalik.STAFF_SCHEMA))
+
+#Малювання графіків панелі з порожнім кешем: послідовно або в пулі потоків/процесів
+def render_charts(charts: Dict[str, tuple], executor: Optional[Executor]) -> Dict[str, bytes]:
+    return Zalik.ChartRenderer(executor=executor).render_all(charts)
+
+#Пули для етапів render_all_*; кожен пул заздалегідь малює графіки, щоб запуск процесів
+#та імпорт matplotlib у них не потрапили у вимірювання
+def chart_pools(charts: Dict[str, tuple], workers: int) -> Dict[str, Executor]:
+    pools = {'threads': ThreadPoolExecutor(workers),
+             'processes': ProcessPoolExecutor(workers, mp_context=multiprocessing.get_context('spawn'))}
+    for pool in pools.values():
+        render_charts(charts, pool)
+    return pools
+
+#Запускає всі етапи для одного набору даних
+def run_size(paths: Dict[str, str], students: int, repeats: int, memory: bool,
+             chart_workers: int = 4) -> List[Dict[str, Any]]:
+    school = load_school(paths)
+    batch = load_staff(paths)
+    batch.calculate()
+    salaries_path = os.path.join(os.path.dirname(paths['staff']), 'salaries.csv')
+    modified = dict(paths, students=os.path.join(os.path.dirname(paths['students']), 'students_modified.csv'))
+    write_modified_students(paths['students'], modified['students'])
+    warm = warm_school(school, paths)
+
+    # Інкрементне оновлення має давати ту саму статистику, що й повне перезавантаження
+    if update_school(school, modified['students']).get_statistics() != reload_school(modified).get_statistics():
+        raise RuntimeError("інкрементне оновлення розійшлося з повним перезавантаженням")
+    charts = school.get_chart_data()
+    pools = chart_pools(charts, chart_workers)
+
+    stages: Dict[str, tuple] = {
+        'read_csv_file': (lambda: paths, read_students),
+        'iter_csv_rows': (lambda: paths, stream_students),
+        'load_data_from_csv': (lambda: paths, load_school),
+        'get_statistics': (lambda: fresh_school(school), lambda s: s.get_statistics()),
+        'chart_data': (lambda: fresh_school(school), lambda s: s.get_chart_data()),
+        'promote_all_classes': (lambda: fresh_school(school), lambda s: s.promote_all_classes()),
+        'full_reload': (lambda: modified, reload_school),
+        'incremental_first': (lambda: school.copy(), lambda s: update_school(s, modified['students'])),
+        'incremental_update': (lambda: warm, lambda s: update_school(s, modified['students'])),
+        'salary_calculation': (lambda: batch, lambda b: b.calculate()),
+        'write_csv_file': (lambda: batch, lambda b: Zalik.write_csv_file(
+            b.iter_rows(), salaries_path, Zalik.salary_fieldnames(b.positions))),
+        # Пам'ять для пулу процесів - лише батьківського процесу
+        'render_all_serial': (lambda: None, lambda _: render_charts(charts, None)),
+        'render_all_threads': (lambda: pools['threads'], lambda pool: render_charts(charts, pool)),
+        'render_all_processes': (lambda: pools['processes'], lambda pool: render_charts(charts, pool)),
+    }
+    results = []
+    try:
+        for stage, (setup, run) in stages.items():
+            result = {'stage': stage, 'students': students, 'staff': len(batch)}
+            result.update(measure(setup, run, repeats, memory))
+            results.append(result)
+            print(f"{students:>10} {stage:<22} {result['seconds']:>10.4f} s"
+                  + (f" {result['peak_bytes'] / 2 ** 20:>10.1f} MiB" if memory else ""))
+    finally:
+        for pool in pools.values():
+            pool.shutdown()
+    return results
+
+#Порівнює з попереднім файлом результатів: відношення часу (> 1 - повільніше)
+def compare(results: List[Dict[str, Any]], baseline_path: str) -> None:
+    with open(baseline_path, encoding='utf-8') as file:
+        baseline = {(r['stage'], r['students']): r for r in json.load(file)['results']}
+    print("\nПорівняння з", baseline_path)
+    for result in results:
+        previous = baseline.get((result['stage'], result['students']))
+        if previous:
+            print(f"{result['students']:>10} {result['stage']:<22} x{result['seconds'] / previous['seconds']:.2f}")
+
+
+def main(argv: Optional[List[str]] = None) -> None:
+    parser = argparse.ArgumentParser(description="Бенчмарки Zalik.py на синтетичних даних")
+    parser.add_argument('--sizes', type=int, nargs='+', default=[1000, 10000, 100000],
+                        help="кількість учнів для кожного запуску (10^3 - 10^7)")
+    parser.add_argument('--verticals', type=int, default=5)
+    parser.add_argument('--staff-ratio', type=float, default=0.1, help="працівників на одного учня")
+    parser.add_argument('--repeats', type=int, default=3)
+    parser.add_argument('--chart-workers', type=int, default=Zalik.CHART_RENDER_WORKERS or 1,
+                        help="потоків/процесів для етапів render_all_threads і render_all_processes")
+    parser.add_argument('--no-memory', action='store_true', help="не вимірювати пам'ять (tracemalloc)")
+    parser.add_argument('--data-dir', help="папка для згенерованих даних (за замовчуванням - тимчасова)")
+    parser.add_argument('--output', default='bench_results.json', help="файл результатів JSON")
+    parser.add_argument('--compare', help="попередній файл результатів для порівняння")
+    args = parser.parse_args(argv)
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for students in args.sizes:
+            directory = os.path.join(args.data_dir or temp_dir, f"school_{students}")
+            paths = generate_dataset(directory, students, args.verticals, max(1, int(students * args.staff_ratio)))
+            results.extend(run_size(paths, students, args.repeats, not args.no_memory, args.chart_workers))
+
+    report = {
+        'meta': {'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'), 'python': sys.version.split()[0],
+                 'platform': platform.platform(), 'repeats': args.repeats},
+        'results': results,
+    }
+    with open(args.output, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2)
+    print(f"\nРезультати записано у {args.output}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+import argparse
+import csv
+import os
+import random
+from itertools import accumulate
+from typing import Dict, List, Tuple
+
+# ГЕНЕРАТОР СИНТЕТИЧНИХ ДАНИХ ШКОЛИ
+# Створює classes.csv, students.csv та staff.csv заданого розміру у форматі, який читає Zalik.py
+
+#Літери вертикалей: після А/Б/В ідуть наступні літери абетки
+VERTICAL_LETTERS = "АБВГДЕЄЖЗИІКЛМНОПРСТУФХЦЧШЩЮЯ"
+
+LAST_NAMES = ["Коваленко", "Мельник", "Шевченко", "Бойко", "Ткаченко", "Кравченко", "Олійник", "Поліщук",
+              "Лисенко", "Савчук", "Руденко", "Марченко", "Бондар", "Мороз", "Павленко", "Гнатюк"]
+MALE_NAMES = [("Іван", "Петрович"), ("Андрій", "Васильович"), ("Максим", "Олегович"), ("Микола", "Ігорович"),
+              ("Сергій", "Михайлович"), ("Дмитро", "Андрійович"), ("Олег", "Сергійович")]
+FEMALE_NAMES = [("Олена", "Сергіївна"), ("Юлія", "Олександрівна"), ("Вікторія", "Павлівна"),
+                ("Яна", "Олегівна"), ("Марія", "Іванівна"), ("Анна", "Дмитрівна"), ("Софія", "Петрівна")]
+
+#Рік, від якого рахується рік народження: учень паралелі p народився приблизно у BASE_YEAR - p - 6
+BASE_YEAR = 2022
+
+#Записує classes.csv: паралелі 1-11 по verticals вертикалей
+def write_classes(path: str, verticals: int) -> List[Tuple[int, str]]:
+    classes = [(parallel, VERTICAL_LETTERS[v]) for parallel in range(1, 12) for v in range(verticals)]
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['parallel', 'vertical'])
+        writer.writerows(classes)
+    return classes
+
+#Записує students.csv потоково; розміри класів нерівномірні (логнормальні ваги, skew - розкид)
+def write_students(path: str, classes: List[Tuple[int, str]], students: int, rng: random.Random,
+                   skew: float = 0.8, chunk_size: int = 100000) -> None:
+    weights = [rng.lognormvariate(0, skew) for _ in classes]
+    cum_weights = list(accumulate(weights))
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['last_name', 'first_name', 'middle_name', 'birth_year', 'gender',
+                         'average_grade', 'parallel', 'vertical'])
+        remaining = students
+        while remaining > 0:
+            batch = min(chunk_size, remaining)
+            remaining -= batch
+            rows = []
+            for parallel, vertical in rng.choices(classes, cum_weights=cum_weights, k=batch):
+                gender = rng.choice('MF')
+                first_name, middle_name = rng.choice(MALE_NAMES if gender == 'M' else FEMALE_NAMES)
+                last_name = rng.choice(LAST_NAMES)
+                grade = min(12.0, max(1.0, rng.gauss(10.0, 1.2)))
+                birth_year = BASE_YEAR - parallel - 6 - rng.randint(0, 1)
+                rows.append((last_name, first_name, middle_name, birth_year, gender,
+                             f"{grade:.1f}", parallel, vertical))
+            writer.writerows(rows)
+
+#Записує staff.csv у форматі STAFF_SCHEMA; на 20 вчителів - один охоронець, директор один
+def write_staff(path: str, staff: int, rng: random.Random) -> None:
+    with open(path, 'w', newline='', encoding='utf-8') as file:
+        writer = csv.writer(file)
+        writer.writerow(['last_name', 'first_name', 'middle_name', 'position',
+                         'pedagogical_experience', 'management_experience', 'total_experience'])
+        for index in range(staff):
+            first_name, middle_name = rng.choice(MALE_NAMES + FEMALE_NAMES)
+            last_name = rng.choice(LAST_NAMES)
+            if index == 0:
+                writer.writerow([last_name, first_name, middle_name, 'Director', rng.randint(10, 40), rng.randint(0, 20), ''])
+            elif index % 21 == 0:
+                writer.writerow([last_name, first_name, middle_name, 'SecurityGuard', '', '', rng.randint(0, 30)])
+            else:
+                writer.writerow([last_name, first_name, middle_name, 'Teacher', rng.randint(0, 40), '', ''])
+
+#Створює повний набір файлів у directory і повертає шляхи до них
+def generate_dataset(directory: str, students: int, verticals: int = 3, staff: int = 0,
+                     seed: int = 0, skew: float = 0.8) -> Dict[str, str]:
+    if not 1 <= verticals <= len(VERTICAL_LETTERS):
+        raise ValueError(f"кількість вертикалей має бути від 1 до {len(VERTICAL_LETTERS)}")
+    os.makedirs(directory, exist_ok=True)
+    rng = random.Random(seed)
+    paths = {'classes': os.path.join(directory, 'classes.csv'),
+             'students': os.path.join(directory, 'students.csv')}
+    classes = write_classes(paths['classes'], verticals)
+    write_students(paths['students'], classes, students, rng, skew)
+    if staff:
+        paths['staff'] = os.path.join(directory, 'staff.csv')
+        write_staff(paths['staff'], staff, rng)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Генератор синтетичних даних школи")
+    parser.add_argument('directory', help="папка для classes.csv, students.csv і staff.csv")
+    parser.add_argument('--students', type=int, default=1000, help="кількість учнів (наприклад, 1000 - 10000000)")
+    parser.add_argument('--verticals', type=int, default=3, help="кількість вертикалей у паралелі")
+    parser.add_argument('--staff', type=int, default=0, help="кількість працівників у staff.csv")
+    parser.add_argument('--skew', type=float, default=0.8, help="нерівномірність розмірів класів")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    paths = generate_dataset(args.directory, args.students, args.verticals, args.staff, args.seed, args.skew)
+    for path in paths.values():
+        print(path)
+
+
+if __name__ == "__main__":
+    main()
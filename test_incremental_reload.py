@@ -0,0 +1,103 @@
+import io
+import random
+
+import pytest
+
+import Zalik
+from generate_data import generate_dataset
+
+# ІНКРЕМЕНТНЕ ПЕРЕЗАВАНТАЖЕННЯ students.csv
+# Результат School.update_students_from_csv має збігатися з повним перезавантаженням того самого файлу
+
+def read_lines(path: str) -> list:
+    with open(path, encoding='utf-8', newline='') as file:
+        return file.read().splitlines()
+
+def to_file(lines: list) -> io.BytesIO:
+    return io.BytesIO(("\n".join(lines) + "\n").encode('utf-8'))
+
+def full_load(classes: bytes, students: io.BytesIO) -> Zalik.School:
+    school = Zalik.School()
+    school.load_data_from_csv(Zalik.iter_csv_rows(io.BytesIO(classes), Zalik.CLASSES_SCHEMA),
+                              Zalik.iter_csv_rows(students, Zalik.STUDENTS_SCHEMA))
+    return school
+
+#Випадкові зміни: оцінки, стать, переведення в інший клас, видалення, повтори й нові учні
+def modify(lines: list, rng: random.Random) -> list:
+    header, rows = lines[0], [line.split(',') for line in lines[1:]]
+    for _ in range(20):
+        rows.pop(rng.randrange(len(rows)))
+    for _ in range(40):
+        row = rows[rng.randrange(len(rows))]
+        change = rng.randrange(3)
+        if change == 0:
+            row[5] = f"{rng.uniform(1, 12):.1f}"
+        elif change == 1:
+            row[4] = 'F' if row[4] == 'M' else 'M'
+        else:
+            row[6], row[7] = str(rng.randint(1, 11)), rng.choice('АБВ')
+    for _ in range(30):
+        row = list(rng.choice(rows)) if rng.random() < 0.5 else \
+            ['Нова', 'Учениця', 'Тестівна', str(rng.randint(2005, 2016)), 'F', '9.5', str(rng.randint(1, 11)), 'А']
+        rows.insert(rng.randrange(len(rows)), row)
+    rows.append(['Зайвий', 'Учень', 'Невідомий', '2010', 'M', '5.0', '42', 'Я'])  # Клас, якого немає в classes.csv
+    rng.shuffle(rows)
+    return [header] + [','.join(row) for row in rows]
+
+@pytest.fixture
+def dataset(tmp_path):
+    paths = generate_dataset(str(tmp_path), 2000, verticals=3, seed=1)
+    with open(paths['classes'], 'rb') as file:
+        classes = file.read()
+    return classes, read_lines(paths['students'])
+
+def test_incremental_update_matches_full_reload(dataset):
+    classes, lines = dataset
+    base = full_load(classes, to_file(lines))
+    base_statistics = base.get_statistics()
+    rng = random.Random(7)
+
+    school = base
+    for _ in range(4):
+        lines = modify(lines, rng)
+        updated = school.copy()
+        counts = updated.update_students_from_csv(to_file(lines))
+        reloaded = full_load(classes, to_file(lines))
+
+        assert counts is not None
+        assert updated.get_statistics() == reloaded.get_statistics()
+        assert updated.get_chart_data() == reloaded.get_chart_data()
+        assert updated.project(1).get_statistics() == reloaded.project(1).get_statistics()
+        assert len(updated.store) == reloaded.get_total_student_count()  # Видалені рядки прибрано зі сховища
+        school = updated
+
+    assert base.get_statistics() == base_statistics  # Спільна школа не змінилася
+
+def test_incremental_update_rejects_promoted_snapshot(dataset):
+    classes, lines = dataset
+    school = full_load(classes, to_file(lines))
+    school.promote_all_classes()
+    snapshot = Zalik.School.from_snapshot_bytes(school.snapshot_bytes())
+    with pytest.raises(ValueError):
+        snapshot.copy().update_students_from_csv(to_file(lines))
+
+#Клас і паралель з одним учнем: зміна оцінки спершу спорожнює їхні списки оцінок, а потім заповнює знову
+def test_incremental_update_single_student_class_and_parallel():
+    classes = "parallel,vertical\n1,А\n2,А\n2,Б\n".encode('utf-8')
+    header = "last_name,first_name,middle_name,birth_year,gender,average_grade,parallel,vertical"
+    lines = [header, "Бойко,Іван,Петрович,2015,M,9.0,1,А", "Мороз,Олена,Іванівна,2014,F,8.0,2,А"]
+    cases = [
+        [header, "Бойко,Іван,Петрович,2015,M,10.5,1,А", "Мороз,Олена,Іванівна,2014,F,8.0,2,А"],
+        [header, "Бойко,Іван,Петрович,2015,M,9.0,1,А", "Мороз,Олена,Іванівна,2014,F,8.5,2,Б"],
+        [header, "Бойко,Іван,Петрович,2015,M,9.0,1,А", "Мороз,Олена,Іванівна,2014,F,8.0,2,Б",
+         "Гнатюк,Яна,Олегівна,2014,F,11.0,2,А"],
+        [header, "Бойко,Іван,Петрович,2015,M,9.0,2,А", "Савчук,Анна,Дмитрівна,2015,F,7.0,1,А",
+         "Мороз,Олена,Іванівна,2014,F,8.0,2,А"],
+    ]
+    base = full_load(classes, to_file(lines))
+    for case in cases:
+        updated = base.copy()
+        assert updated.update_students_from_csv(to_file(case)) is not None
+        reloaded = full_load(classes, to_file(case))
+        assert updated.get_statistics() == reloaded.get_statistics()
+        assert updated.get_chart_data() == reloaded.get_chart_data()